@@ -24,6 +24,7 @@ from dataclasses import dataclass, field
 from guiml.resources import ResourceManager
 from pathlib import Path
 import json
+import uuid
 
 BASE_DIR = Path(__file__).parent.resolve()
 
@@ -60,6 +61,8 @@ def main():
 class TodoItem:
     text: str
     done: bool = False
+    # stable identity of the item, used as persistance key
+    key: str = field(default_factory=lambda: uuid.uuid4().hex)
 
 
 @injectable("todo")
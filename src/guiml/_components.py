@@ -1,14 +1,17 @@
 from dataclasses import dataclass as _dataclass
 from typing import Optional, Callable
 
+from guiml.dirty import mark_dirty
+
 
 class StyleClassHandler:
     """
     Helper class to manage dyamically set style classes of a component.
     """
 
-    def __init__(self):
+    def __init__(self, on_change=None):
         self.classes = dict()
+        self.on_change = on_change
 
     def get(self):
         result = list()
@@ -26,7 +29,10 @@ class StyleClassHandler:
         class will only be added if the condition returns true when called.
         """
 
-        self.classes[style_class] = condition
+        if self.classes.get(style_class, False) is not condition:
+            self.classes[style_class] = condition
+            if self.on_change is not None:
+                self.on_change()
 
     def __contains__(self, style_class):
         return style_class in self.get()
@@ -36,7 +42,10 @@ class StyleClassHandler:
         Remove the given style class.
         """
 
-        self.classes.pop(style_class, None)
+        if style_class in self.classes:
+            del self.classes[style_class]
+            if self.on_change is not None:
+                self.on_change()
 
 
 class Component:
@@ -53,9 +62,9 @@ class Component:
         """
         The properties dataclass is used to specify all properties of a
         component. Properties will be automatically injected when the
-        component is constructed and will be replaced with every draw cycle.
-        The Properties instance can be acccessed
-        through :code:`self.properties`.
+        component is constructed and will be updated with every draw cycle,
+        see :code:`on_properties_changed`. The Properties instance can be
+        acccessed through :code:`self.properties`.
 
         .. note::
             When inheriting a component, make sure to also inherit the
@@ -81,7 +90,7 @@ class Component:
     def __init__(self, properties, dependencies):
         self.properties = properties
         self.dependencies = dependencies
-        self.style_classes = StyleClassHandler()
+        self.style_classes = StyleClassHandler(self.mark_dirty)
         self.on_init()
 
     def on_init(self):
@@ -97,6 +106,56 @@ class Component:
         """
         pass
 
+    def on_hide(self):
+        """
+        This method is called when the component is removed, but kept alive
+        to be shown again later, see the :code:`keep_alive` attribute. A
+        hidden component should neither draw nor react to input.
+        """
+        pass
+
+    def on_show(self):
+        """
+        This method is called when a hidden component is shown again, see
+        :code:`on_hide`.
+        """
+        pass
+
+    def on_recycle(self, properties):
+        """
+        This method is called when a removed component is reused for a new
+        node with the same tag, instead of creating a new component. Only
+        components registered with :code:`recycle` set are reused. Overwrite
+        it to reset state that belongs to the old node and call
+        :code:`super().on_recycle(properties)`, which replaces the
+        properties.
+
+        Args:
+            properties: the properties for the new node
+        """
+        self.properties = properties
+
+    def on_properties_changed(self, changed_fields):
+        """
+        This method is called when the properties are renewed and the values
+        of some fields changed. Values of two way bindings are always read
+        from the binding and are not reported.
+
+        Args:
+            changed_fields (set): names of the changed fields
+        """
+        pass
+
+    def mark_dirty(self):
+        """
+        Request that this component and its children are renewed in the next
+        frame. This is only required when rendering incrementally and the
+        state used by the template changed outside of an event handler or a
+        two way binding of this component, which mark the component
+        automatically.
+        """
+        mark_dirty(self)
+
 
 class AsMemberMixin:
     """Inheriting from this class allows to access properties and dependencies
@@ -0,0 +1,290 @@
+import ast
+import hashlib
+import importlib.util
+import logging
+import os
+
+from pathlib import Path
+
+from guiml.transformer import (
+    ControlTransformer,
+    has_template,
+    loop_variables,
+    split_text,
+)
+
+CACHE_DIRECTORY = "__guiml_cache__"
+
+# Increase whenever the generated code changes, to invalidate cached files.
+COMPILER_VERSION = 1
+
+
+class CodeWriter:
+
+    def __init__(self):
+        self.lines = list()
+        self.indent = 0
+        self.counter = 0
+
+    def line(self, text):
+        self.lines.append("    " * self.indent + text)
+
+    def name(self, prefix):
+        self.counter += 1
+        return f"_guiml_{prefix}{self.counter}"
+
+    def source(self):
+        return "\n".join(self.lines) + "\n"
+
+
+class TemplateCompiler:
+    """
+    Compiles templates ahead of time into python functions, which expand the
+    template into the children of a component the same way the
+    ControlTransformer does, but without interpreting the template on every
+    renew: attributes are sorted by their prefix when compiling, if and for
+    controls become python control flow and expressions are inlined.
+
+    The generated source is cached in a directory next to the template file,
+    so that the template only needs to be compiled again if it changes.
+    """
+
+    CONTROL_ATTRIBUTE = ControlTransformer.CONTROL_ATTRIBUTE
+
+    def __init__(self, use_disk_cache=True):
+        self.use_disk_cache = use_disk_cache
+        # maps component names to the prototype the render function was
+        # compiled from and the render function
+        self.compiled = dict()
+
+    def get(self, meta_data, prototype):
+        """
+        The render function for the prototype of the component or None if the
+        template could not be compiled.
+        """
+
+        cached = self.compiled.get(meta_data.name)
+        if cached is None or cached[0] is not prototype:
+            try:
+                render = self.load(meta_data, prototype)
+            except Exception:
+                logging.exception(
+                    f"Could not compile template of '{meta_data.name}', "
+                    "the template is interpreted instead.")
+                render = None
+
+            cached = (prototype, render)
+            self.compiled[meta_data.name] = cached
+
+        return cached[1]
+
+    def load(self, meta_data, prototype):
+        statics = [self.static_attributes(node) for node in prototype.iter()]
+
+        path = self.cache_path(meta_data, prototype)
+        if path is not None and not path.exists():
+            try:
+                self.write_cache(path, self.generate(prototype))
+            except OSError as e:
+                logging.warning(f"Could not cache compiled template: {e}")
+                path = None
+
+        if path is None:
+            namespace = {"_guiml_statics": statics}
+            code = compile(self.generate(prototype),
+                           f"<template {meta_data.name}>", "exec")
+            exec(code, namespace)
+            return namespace["render"]
+        else:
+            # Loading the cached file as module also allows python to cache
+            # the byte code.
+            spec = importlib.util.spec_from_file_location(
+                f"_guiml_template_{path.stem}", path)
+            module = importlib.util.module_from_spec(spec)
+            module._guiml_statics = statics
+            spec.loader.exec_module(module)
+            return module.render
+
+    def signature(self, prototype):
+        digest = hashlib.sha1(str(COMPILER_VERSION).encode())
+        for node in prototype.iter():
+            attributes = [(key, value) for key, value in node.attrib.items()
+                          if isinstance(value, str)]
+            digest.update(
+                repr((node.tag, has_template(node.tag), attributes, node.text,
+                      node.tail)).encode())
+
+        return digest.hexdigest()[:16]
+
+    def cache_path(self, meta_data, prototype):
+        if not self.use_disk_cache:
+            return None
+
+        loader = getattr(meta_data.template, "loader", None)
+        filename = getattr(loader, "filename", None)
+        if filename is None:
+            return None
+
+        filename = Path(filename)
+        name = f"{filename.stem}_{meta_data.name}"
+        return (filename.parent / CACHE_DIRECTORY /
+                f"{name}_{self.signature(prototype)}.py")
+
+    def write_cache(self, path, source):
+        path.parent.mkdir(exist_ok=True)
+
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as file:
+            file.write(source)
+        os.replace(tmp_path, path)
+
+        # remove outdated versions of the same template
+        prefix = path.stem.rsplit("_", 1)[0]
+        for old_path in path.parent.glob(f"{prefix}_*.py"):
+            if old_path != path and old_path.stem.rsplit("_", 1)[0] == prefix:
+                try:
+                    old_path.unlink()
+                except OSError:
+                    pass
+
+    def is_dynamic(self, key, value):
+        if key.startswith("class_"):
+            return True
+
+        return isinstance(value, str) and (key.startswith("py_")
+                                           or key.startswith("on_")
+                                           or key.startswith("bind_"))
+
+    def static_attributes(self, node):
+        return {
+            key: value
+            for key, value in node.attrib.items()
+            if key != self.CONTROL_ATTRIBUTE
+            and not self.is_dynamic(key, value)
+        }
+
+    def generate(self, prototype):
+        """
+        Generate the python source of the render function for the prototype.
+        """
+
+        writer = CodeWriter()
+        index = {id(node): i for i, node in enumerate(prototype.iter())}
+
+        writer.line("from guiml.dirty import mark_dirty as _guiml_mark_dirty")
+        writer.line("")
+        writer.line("")
+        writer.line("def render(self, _guiml_target, _guiml_rt):")
+        writer.indent += 1
+        self.write_content(writer, prototype, "_guiml_target", index)
+        writer.indent -= 1
+
+        return writer.source()
+
+    def place_words(self, target, position, text):
+        words = tuple(split_text(text))
+        if words:
+            return f"_guiml_rt.place_words({target}, {position}, {words!r})"
+        else:
+            return position
+
+    def write_content(self, writer, node, target, index):
+        position = writer.name("position")
+
+        if node.tag == "text":
+            writer.line(f"{target}.text = {node.text!r}")
+            writer.line(f"{position} = 0")
+        else:
+            writer.line(f"{target}.text = None")
+            writer.line(
+                f"{position} = {self.place_words(target, 0, node.text)}")
+
+        for child in node:
+            self.write_child(writer, child, target, position, index)
+
+        writer.line(f"del {target}[{position}:]")
+
+    def write_child(self, writer, node, target, position, index):
+        control = node.get(self.CONTROL_ATTRIBUTE)
+
+        if not control:
+            self.write_node(writer, node, target, position, index)
+            return
+
+        control = control.strip()
+        if control[:2] == "if":
+            writer.line(f"if ({control[2:]}):")
+            writer.indent += 1
+            self.write_node(writer, node, target, position, index)
+            writer.indent -= 1
+
+        elif control[:3] == "for":
+            loop = ast.parse(f"{control}: pass").body[0]
+            if not isinstance(loop, ast.For):
+                raise SyntaxError(f"Invalid for control: '{control}'")
+
+            # The body is a function, so that closures created for one
+            # iteration keep the values of the loop variables.
+            body = writer.name("for")
+            arguments = ", ".join([target, position] +
+                                  loop_variables(loop.target))
+
+            writer.line(f"def {body}({arguments}):")
+            writer.indent += 1
+            self.write_node(writer, node, target, position, index)
+            writer.line(f"return {position}")
+            writer.indent -= 1
+
+            writer.line(f"for {ast.unparse(loop.target)} "
+                        f"in {ast.unparse(loop.iter)}:")
+            writer.indent += 1
+            writer.line(f"{position} = {body}({arguments})")
+            writer.indent -= 1
+
+    def write_node(self, writer, node, target, position, index):
+        child = writer.name("node")
+
+        writer.line(
+            f"{child} = _guiml_rt.place({target}, {position}, {node.tag!r})")
+        writer.line(f"{child}.attrib = _guiml_statics[{index[id(node)]}]"
+                    ".copy()")
+        writer.line(f"{child}.tail = None")
+
+        for key, value in node.attrib.items():
+            if key == self.CONTROL_ATTRIBUTE:
+                continue
+            if not self.is_dynamic(key, value):
+                continue
+
+            if key.startswith("py_"):
+                writer.line(f"{child}.attrib[{key[3:]!r}] = ({value})")
+            elif key.startswith("on_"):
+                writer.line(f"{child}.attrib[{key!r}] = "
+                            f"_guiml_rt.event(({value}), self)")
+            elif key.startswith("bind_"):
+                self.write_binding(writer, child, key[5:], value)
+            elif key.startswith("class_"):
+                writer.line(f"{child}.attrib['_expanded_{key}'] = "
+                            f"lambda: bool({value})")
+
+        if not has_template(node.tag):
+            self.write_content(writer, node, child, index)
+
+        tail = self.place_words(target, f"{position} + 1", node.tail)
+        writer.line(f"{position} = {tail}")
+
+    def write_binding(self, writer, child, key, value):
+        getter = writer.name("get")
+        setter = writer.name("set")
+
+        writer.line(f"def {getter}(_guiml_instance):")
+        writer.line(f"    return ({value})")
+
+        writer.line(f"def {setter}(_guiml_instance, _guiml_value):")
+        assigned = ast.parse(f"({value}) = None").body[0].targets[0]
+        if isinstance(assigned, ast.Name):
+            writer.line(f"    nonlocal {assigned.id}")
+        writer.line(f"    ({value}) = _guiml_value")
+        writer.line("    _guiml_mark_dirty(self)")
+
+        writer.line(f"{child}.attrib[{key!r}] = property({getter}, {setter})")
@@ -1,5 +1,6 @@
 from guiml.registry import component  # noqa: F401
 from guiml._components import *  # noqa: F401, F403
+from guiml.reactive import Reactive  # noqa: F401
 # Expose some of the base components here for convenience.
 from guimlcomponents.base.container import Container  # noqa: F401
 from guimlcomponents.base.container import DrawableComponent  # noqa: F401
@@ -1,5 +1,8 @@
 import dataclasses
 import copy
+import functools
+import itertools
+import time
 import typing
 
 
@@ -7,19 +10,23 @@ import xml.etree.ElementTree as ET
 
 from dataclasses import dataclass
 from typing import Optional, Any
-from collections import defaultdict, namedtuple
+from collections import defaultdict, namedtuple, OrderedDict
 from pyglet import app
 
 from guiml.transformer import (
     DynamicDOM,
     TemplatesTransformer,
     ControlTransformer,
+    ForExpansion,
     TextTransformer,
 )
 
 from guiml.registry import _components, _layouts
-from guiml.injectables import Injector, UILoop, TimeIt, timeit
-from guiml.resources import reload_resources
+from guiml.injectables import Injector, UILoop, timeit
+from guiml.resources import reload_resources, SelectorIndex
+from guiml.compiler import TemplateCompiler
+from guiml.dirty import pop_dirty, clear_dirty
+from guiml import reactive
 
 import logging
 
@@ -54,19 +61,56 @@ def merge_data(a, b):
     Merges b into a, b taking precedence. b is not modified.
     """
 
-    if isinstance(a, list) and isinstance(b, list):
-        return b + a
-    elif isinstance(a, dict) and isinstance(b, dict):
-        result = dict(**a)
-        for key, value in b.items():
-            if key in result:
-                result[key] = merge_data(result[key], value)
-            else:
-                result[key] = value
+    return merge_layers((a, b))
 
-        return result
+
+def merge_layers(layers):
+    """
+    Merges a sequence of data, later layers taking precedence, as if
+    merge_data was applied to each layer in turn. The layers are not
+    modified and only the merged dictionaries and lists are allocated,
+    values that are not overwritten are shared with the layers.
+    """
+
+    top = layers[-1]
+    if isinstance(top, dict):
+        kind = dict
+    elif isinstance(top, list):
+        kind = list
     else:
-        return b
+        return top
+
+    # Only the layers after the last value of a different kind contribute.
+    start = len(layers) - 1
+    while start > 0 and isinstance(layers[start - 1], kind):
+        start -= 1
+
+    if start == len(layers) - 1:
+        return top
+
+    if kind is list:
+        result = list()
+        for layer in reversed(layers[start:]):
+            result.extend(layer)
+
+        return result
+
+    result = dict()
+    nested = None
+    for layer in layers[start:]:
+        for key, value in layer.items():
+            if key in result and isinstance(value, (dict, list)):
+                if nested is None:
+                    nested = set()
+                nested.add(key)
+            result[key] = value
+
+    if nested is not None:
+        for key in nested:
+            result[key] = merge_layers(
+                [layer[key] for layer in layers[start:] if key in layer])
+
+    return result
 
 
 NodeComponentPair = namedtuple("NodeComponentPair", "node component")
@@ -110,30 +154,149 @@ class OrderPersistation:
         return iter(self.storage.values())
 
 
+class KeyPersistation:
+    """
+    Match children by the value of their persistance key attribute, so that
+    the data follows the child if children are inserted, removed or
+    reordered. Keys need to be hashable. Children with the same key are
+    matched by their order.
+    """
+
+    KEY_ATTRIBUTE = "persistance_key"
+
+    def __init__(self):
+        self.storage = dict()
+
+    def keys(self, children):
+        key_counter = defaultdict(int)
+        for child in children:
+            key = (child.tag, child.get(self.KEY_ATTRIBUTE))
+            number = key_counter[key]
+            yield key + (number,)
+            key_counter[key] = number + 1
+
+    def save(self, children, payloads):
+        self.storage = dict(zip(self.keys(children), payloads))
+
+    def load(self, children):
+        for key in self.keys(children):
+            yield self.storage.get(key)
+
+    def __iter__(self):
+        return iter(self.storage.values())
+
+
+_strategies = {
+    "order": OrderPersistation,
+    "key": KeyPersistation,
+}
+
+
 def new_strategy_from_name(name):
-    if name != "order":
-        raise NotImplementedError()
-    return OrderPersistation()
+    try:
+        strategy_cls = _strategies[name]
+    except KeyError:
+        raise NotImplementedError(
+            f"Unknown persistation strategy '{name}'.") from None
+    return strategy_cls()
+
+
+def run_steps(steps):
+    """
+    Run the generator to its end.
+
+    Returns:
+        the return value of the generator
+    """
+
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
 
 
 class PersistationManager():
     STRATEGY_ATTRIBUTE = "persistation_strategy"
+    PERSISTANCE_KEY_ATTRIBUTE = KeyPersistation.KEY_ATTRIBUTE
+    # Nodes with this attribute are kept alive when they are removed, see
+    # park_data_node.
+    KEEP_ALIVE_ATTRIBUTE = "keep_alive"
 
-    @dataclass
+    @dataclass(eq=False)
     class DataNode:
         children: dict[str, PersistationStrategy] = \
             dataclasses.field(default_factory=dict)
         data: Any = None
+        # the node the data was renewed with
+        node: Any = None
+        parent: "Optional[PersistationManager.DataNode]" = \
+            dataclasses.field(default=None, repr=False)
+        # the value of the keep alive attribute of node
+        keep_alive: Any = None
+        # maps (tag, keep alive value) to removed children that are kept
+        # alive
+        parked: Optional[dict] = None
+        # maps tags to removed children that can be recycled
+        recycled: Optional[dict] = None
+        # If the data was parked or pooled for recycling and is not shown
+        # again yet. It is shown when the node is renewed.
+        hidden: bool = False
+        # If the data is reused for a new node and not renewed yet.
+        recycling: bool = False
+
+        def __iter__(self):
+            for strategy in self.children.values():
+                yield from strategy
+
+    @dataclass(eq=False)
+    class Frame:
+        """
+        State of a node while its children are traversed.
+        """
+
+        node: Any
+        data_node: "PersistationManager.DataNode"
+        data: Any
+        childs_by_strategy: dict
+        restored_childs: dict
+        children: Any
+        child_data: dict = dataclasses.field(default_factory=dict)
+        created: bool = False
 
     def __init__(self):
         self.root = None
 
+        # the maximal number of removed subtrees that are kept alive
+        self.max_kept_alive = 16
+        # maps ids of the parked data nodes to (parent, key, data node), in
+        # the order they were parked
+        self.kept_alive = OrderedDict()
+
     def create_data(self, node, parent_nodes):
         pass
 
     def destroy_data(self, data):
         pass
 
+    def on_data_parked(self, data):
+        pass
+
+    def on_data_unparked(self, data):
+        pass
+
+    def on_data_recycled(self, data, node, parent_nodes):
+        self.on_data_restored(data, node, parent_nodes)
+
+    def recycle_limit(self, data, node):
+        """
+        Returns:
+            int: the number of removed children with the tag of node that
+                are kept for reuse by each parent, if the data is recyclable
+        """
+
+        return 0
+
     def on_data_restored(self, data, node, parent_nodes):
         pass
 
@@ -141,25 +304,232 @@ class PersistationManager():
         pass
 
     def renew(self, root_node):
-        self.root = self.traverse(root_node, self.root, [])
+        run_steps(self.iter_renew(root_node))
+
+    def iter_renew(self, root_node):
+        """
+        Like renew, but yields after each renewed node, so that renewing can
+        be interrupted and resumed. The data nodes are renewed in place, so
+        the tree is only partially renewed while renewing is suspended.
+        """
+
+        self.root = yield from self.iter_traverse(root_node, self.root, [])
+
+    def renew_data_nodes(self, data_nodes):
+        """
+        Renew the subtrees of the given data nodes. All other data nodes are
+        kept as they are from the last renew.
+        """
+
+        run_steps(self.iter_renew_data_nodes(data_nodes))
+
+    def iter_renew_data_nodes(self, data_nodes):
+        """
+        Like renew_data_nodes, but yields after each renewed node, see
+        iter_renew.
+        """
+
+        to_renew = set(id(data_node) for data_node in data_nodes)
+
+        on_path = set()
+        for data_node in data_nodes:
+            parent = data_node.parent
+            while parent is not None and id(parent) not in on_path:
+                on_path.add(id(parent))
+                parent = parent.parent
+
+        # None marks that all children of the last node on the path are
+        # visited.
+        parent_nodes = list()
+        stack = [self.root]
+        while stack:
+            data_node = stack.pop()
+            if data_node is None:
+                parent_nodes.pop()
+            elif id(data_node) in to_renew:
+                yield from self.iter_renew_data_node(data_node, parent_nodes)
+            elif id(data_node) in on_path:
+                parent_nodes.append(data_node.node)
+                stack.append(None)
+                stack.extend(reversed(list(data_node)))
+
+    def iter_renew_data_node(self, data_node, parent_nodes):
+        yield from self.iter_traverse(data_node.node, data_node, parent_nodes)
 
     def destroy_data_node(self, data_node):
-        for strategy in data_node.children.values():
-            for child_data_node in strategy:
-                self.destroy_data_node(child_data_node)
+        # Children are destroyed before their parent, None marks that the
+        # next node on the stack has no children left.
+        stack = [data_node]
+        while stack:
+            data_node = stack.pop()
+            if data_node is None:
+                self.destroy_data(stack.pop().data)
+            else:
+                stack.append(data_node)
+                stack.append(None)
+                stack.extend(reversed(list(data_node)))
+                if data_node.parked:
+                    for parked in data_node.parked.values():
+                        self.kept_alive.pop(id(parked), None)
+                        stack.append(parked)
+                if data_node.recycled:
+                    for pool in data_node.recycled.values():
+                        stack.extend(pool)
+
+    def iter_subtree(self, data_node):
+        """
+        Yield the data nodes of the subtree, without parked subtrees.
+        """
+
+        stack = [data_node]
+        while stack:
+            data_node = stack.pop()
+            yield data_node
+            stack.extend(data_node)
+
+    def park_data_node(self, parent, data_node):
+        """
+        Keep the removed subtree of data_node alive instead of destroying it,
+        so that it is restored if parent gets a child with the same tag and
+        keep alive value again. Only the subtrees parked last are kept.
+        """
+
+        key = (data_node.node.tag, data_node.keep_alive)
+        if parent.parked is None:
+            parent.parked = dict()
+
+        old = parent.parked.get(key)
+        if old is not None:
+            self.kept_alive.pop(id(old))
+            self.destroy_data_node(old)
+
+        parent.parked[key] = data_node
+        self.kept_alive[id(data_node)] = (parent, key, data_node)
+        self.hide_subtree(data_node)
+
+        while len(self.kept_alive) > self.max_kept_alive:
+            parent, key, data_node = self.kept_alive.popitem(last=False)[1]
+            del parent.parked[key]
+            self.destroy_data_node(data_node)
+
+    def hide_subtree(self, data_node):
+        """
+        Hide the data of the subtree of a parked or pooled data node. Each
+        data is shown again when its node is renewed, see enter_node.
+        """
+
+        for hidden in self.iter_subtree(data_node):
+            if not hidden.hidden:
+                hidden.hidden = True
+                self.on_data_parked(hidden.data)
+
+    def unpark_data_node(self, parent, tag, keep_alive):
+        """
+        Returns:
+            the data node parked by parent for tag and keep_alive or None
+        """
+
+        if not parent.parked:
+            return None
+
+        data_node = parent.parked.pop((tag, keep_alive), None)
+        if data_node is not None:
+            del self.kept_alive[id(data_node)]
+
+        return data_node
+
+    def recycle_data_node(self, parent, tag, removed):
+        """
+        Get a data node with tag to reuse for a new child of parent, either
+        from the children removed in this renew or from the pool of parent.
+
+        Returns:
+            the data node or None
+        """
+
+        data_nodes = removed.get(tag)
+        if data_nodes:
+            return data_nodes.pop()
+
+        if parent.recycled:
+            pool = parent.recycled.get(tag)
+            if pool:
+                return pool.pop()
+
+        return None
+
+    def pool_data_node(self, parent, data_node):
+        """
+        Keep the removed data node for reuse by a later child of parent. The
+        oldest data node is destroyed if the pool is full, see recycle_limit.
+        """
 
-        self.destroy_data(data_node.data)
+        if parent.recycled is None:
+            parent.recycled = dict()
+
+        pool = parent.recycled.setdefault(data_node.node.tag, list())
+        pool.append(data_node)
+        self.hide_subtree(data_node)
+
+        if len(pool) > self.recycle_limit(data_node.data, data_node.node):
+            self.destroy_data_node(pool.pop(0))
 
     def destroy_root(self):
         self.destroy_data_node(self.root)
 
     def traverse(self, node, restored_data, parent_nodes):
+        """
+        Renew the data of node and all nodes below. The tree is traversed
+        with an explicit stack, so that its depth is not limited by the
+        recursion limit.
+        """
+
+        return run_steps(self.iter_traverse(node, restored_data,
+                                            parent_nodes))
+
+    def iter_traverse(self, node, restored_data, parent_nodes):
+        """
+        Like traverse, but yields after each renewed node and returns the
+        data node of node.
+        """
+
+        stack = [self.enter_node(node, restored_data, parent_nodes)]
+        while True:
+            yield
+
+            frame = stack[-1]
+            child = next(frame.children, None)
+            if child is not None:
+                stack.append(self.enter_node(
+                    child, frame.restored_childs[child], parent_nodes))
+                continue
+
+            stack.pop()
+            data_node = self.leave_node(frame, parent_nodes)
+            if not stack:
+                return data_node
+
+            stack[-1].child_data[frame.node] = data_node
+
+    def enter_node(self, node, restored_data, parent_nodes):
+        """
+        Renew the data of node and prepare traversing its children.
+        """
+
         if restored_data is None:
             restored_data = self.DataNode()
 
         data = restored_data.data
-        if data is None:
+        created = data is None
+        if restored_data.hidden:
+            restored_data.hidden = False
+            self.on_data_unparked(data)
+
+        if created:
             data = self.create_data(node, parent_nodes)
+        elif restored_data.recycling:
+            restored_data.recycling = False
+            self.on_data_recycled(data, node, parent_nodes)
         else:
             self.on_data_restored(data, node, parent_nodes)
         self.on_data_renewed(data, node, parent_nodes)
@@ -169,45 +539,158 @@ class PersistationManager():
             childs_by_strategy[child.get(self.STRATEGY_ATTRIBUTE,
                                          "order")].append(child)
 
-        maintained = set()
-        restored_childs = dict()
+        restored_childs = self.restore_children(restored_data,
+                                                childs_by_strategy)
+
+        parent_nodes.append(node)
+
+        return self.Frame(node, restored_data, data, childs_by_strategy,
+                          restored_childs, iter(node), created=created)
+
+    def restore_children(self, restored_data, childs_by_strategy):
+        """
+        Match the children of a node with the data nodes of its children from
+        the last renew. Data nodes that are not matched are parked, reused for
+        children without data or destroyed.
+
+        Returns:
+            dict: maps the children to their data node or None
+        """
 
+        restored_childs = dict()
         for key, children in childs_by_strategy.items():
             strategy = restored_data.children.get(key)
             if strategy:
-                for child, data_node in zip(children, strategy.load(children)):
-                    restored_childs[child] = data_node
-                    if data_node is not None:
-                        maintained.add(id(data_node.data))
+                loaded = strategy.load(children)
             else:
-                for child in children:
-                    restored_childs[child] = None
+                loaded = itertools.repeat(None)
+
+            for child, data_node in zip(children, loaded):
+                restored_childs[child] = self.match_child(restored_data, child,
+                                                          data_node)
+
+        self.remove_children(restored_data, restored_childs)
+        return restored_childs
+
+    def match_child(self, parent, child, data_node):
+        """
+        The data node to restore for child, given the data node loaded for it
+        or None.
+        """
+
+        # Data is only restored for the same keep alive value.
+        keep_alive = child.get(self.KEEP_ALIVE_ATTRIBUTE)
+        if data_node is not None and data_node.keep_alive != keep_alive:
+            data_node = None
+        if data_node is None and keep_alive is not None:
+            data_node = self.unpark_data_node(parent, child.tag, keep_alive)
+
+        return data_node
+
+    def remove_children(self, parent, restored_childs):
+        """
+        Park, recycle or destroy the children of the data node parent that
+        are not restored. Recycled data nodes are added to restored_childs
+        for children without data.
+        """
+
+        maintained = set(
+            id(data_node.data) for data_node in restored_childs.values()
+            if data_node is not None)
+
+        # maps tags to removed data nodes that can be recycled
+        removed = defaultdict(list)
+        for data_node in parent:
+            if data_node.data is None or id(data_node.data) in maintained:
+                continue
+
+            if data_node.keep_alive is not None:
+                self.park_data_node(parent, data_node)
+            elif self.recycle_limit(data_node.data, data_node.node):
+                removed[data_node.node.tag].append(data_node)
+            else:
+                self.destroy_data_node(data_node)
 
-        for strategy in restored_data.children.values():
-            for data_node in strategy:
-                if (data_node.data is not None
-                        and id(data_node.data) not in maintained):
-                    self.destroy_data_node(data_node)
+        if removed or parent.recycled:
+            for child, data_node in restored_childs.items():
+                if (data_node is not None
+                        or child.get(self.KEEP_ALIVE_ATTRIBUTE) is not None):
+                    continue
 
-        parent_nodes.append(node)
+                data_node = self.recycle_data_node(parent, child.tag, removed)
+                if data_node is not None:
+                    restored_childs[child] = data_node
+                    data_node.recycling = True
+
+            for data_nodes in removed.values():
+                for data_node in data_nodes:
+                    self.pool_data_node(parent, data_node)
+
+    def iter_renew_children(self, data_node, parent_nodes, nodes):
+        """
+        Renew the given children of the node of data_node, after children
+        were inserted, removed or moved in place. The node itself and all
+        other children are not renewed, the children keep the data they were
+        renewed with last.
+        """
+
+        node = data_node.node
+        old = {id(child.node): child for child in data_node}
+        renew = set(map(id, nodes))
+
+        childs_by_strategy = defaultdict(list)
+        restored_childs = dict()
+        for child in node:
+            childs_by_strategy[child.get(self.STRATEGY_ATTRIBUTE,
+                                         "order")].append(child)
+            restored_childs[child] = self.match_child(
+                data_node, child, old.get(id(child)))
 
+        self.remove_children(data_node, restored_childs)
+
+        parent_nodes.append(node)
         child_data = dict()
         for child in node:
-            data_node = self.traverse(child, restored_childs[child],
-                                      parent_nodes)
-            child_data[child] = data_node
+            child_data_node = restored_childs[child]
+            if (id(child) in renew or child_data_node is None
+                    or child_data_node is not old.get(id(child))):
+                child_data_node = yield from self.iter_traverse(
+                    child, child_data_node, parent_nodes)
+            child_data[child] = child_data_node
+        parent_nodes.pop()
+
+        self.save_children(data_node, childs_by_strategy, child_data)
+
+    def leave_node(self, frame, parent_nodes):
+        """
+        Save the data of the node after all children are traversed.
+
+        Returns:
+            DataNode: the data node of the node
+        """
 
         parent_nodes.pop()
 
-        saved_data = self.DataNode()
-        saved_data.data = data
+        # The data node is updated in place, so that references to it stay
+        # valid for renewing it on its own later.
+        saved_data = frame.data_node
+        saved_data.data = frame.data
+        saved_data.node = frame.node
+        saved_data.keep_alive = frame.node.get(self.KEEP_ALIVE_ATTRIBUTE)
+        self.save_children(saved_data, frame.childs_by_strategy,
+                           frame.child_data)
+
+        return saved_data
 
+    def save_children(self, saved_data, childs_by_strategy, child_data):
+        saved_data.children = dict()
         for key, children in childs_by_strategy.items():
             strategy = new_strategy_from_name(key)
             strategy.save(children, [child_data[child] for child in children])
             saved_data.children[key] = strategy
 
-        return saved_data
+        for child_data_node in child_data.values():
+            child_data_node.parent = saved_data
 
     def __iter__(self):
         pass
@@ -218,6 +701,26 @@ class NodeObjects:
     component: "Optional[Component]" = None  # noqa: F821
     layout: "Optional[Layout]" = None  # noqa: F821
     injectables: Optional[dict] = None
+    # all injectables available to the node and its children, see Injector
+    providers: Optional[dict] = None
+    scopes: Optional[dict] = None
+    # injectables shared with other nodes, see Scope
+    shared: Optional[list] = None
+    # position of the component before layouting
+    initial_position: Any = None
+
+    # The layout is only computed again for nodes that were renewed and for
+    # nodes whose children changed in size or that were moved, see
+    # ComponentManager.layout.
+    renewed: bool = False
+    dirty_descendants: bool = False
+    relayout: bool = False
+    # position, width and height of the component after measuring
+    measured: Any = None
+    # data of the children placed by the layout of this node, or by the
+    # layout of the parent if the component of this node is not placed
+    # itself, see ComponentManager.get_layout_children
+    layout_children: Optional[list] = None
 
     def on_destroy(self):
         if self.component:
@@ -227,62 +730,167 @@ class NodeObjects:
             for injectable in reversed(self.injectables.values()):
                 injectable.on_destroy()
 
+        if self.shared:
+            for injectable in reversed(self.shared):
+                injectable._guiml_scope.release(injectable)
+
+
+def bound_property(name):
+    """
+    Property forwarding to the binding stored for name in the instance.
+    """
 
-def add_properties(base, properties):
-    for name, data in properties.items():
-        value, field_type = data
-        setattr(base, name, value)
+    def fget(self):
+        return self._guiml_bindings[name].fget(self)
 
+    def fset(self, value):
+        bindings = self.__dict__.get("_guiml_bindings")
+        if bindings is None:
+            # The dataclass initializes the fields before the bindings are
+            # set, these values are not used.
+            return
 
-def structure(data, data_type):
-    if data is None:
-        return None
-    elif isinstance(data, data_type):
-        return data
-    elif dataclasses.is_dataclass(data_type):
-        args = dict()
-        properties = dict()
-        for field in dataclasses.fields(data_type):
-            try:
-                value = data[field.name]
-            except KeyError:
-                pass
+        bindings[name].fset(self, value)
+
+    return property(fget, fset)
+
+
+# maps (dataclass, names of bound fields) to the class with properties for
+# the bound fields, see bound_class
+_bound_classes = dict()
+
+
+def bound_class(data_type, names):
+    key = (data_type, names)
+    result = _bound_classes.get(key)
+    if result is None:
+        result = type('guiml_added_properties', (data_type, ),
+                      {name: bound_property(name) for name in names})
+        _bound_classes[key] = result
+
+    return result
+
+
+def _keep(value):
+    return value
+
+
+# maps dataclasses to their conversion plan, see structure_plan
+_structure_plans = dict()
+
+# maps types to the function converting data to the type, see get_converter
+_converters = dict()
+
+
+def structure_plan(data_type):
+    """
+    List of (field name, converter) for the fields of the dataclass
+    data_type. The converter is None if values for the field are ignored.
+    """
+
+    plan = _structure_plans.get(data_type)
+    if plan is not None:
+        return plan
+
+    plan = list()
+    for field in dataclasses.fields(data_type):
+        origin = typing.get_origin(field.type)
+        if origin is None:
+            convert = get_converter(field.type)
+        elif origin is typing.Union:
+            type_args = typing.get_args(field.type)
+            if len(type_args) == 2 and type(None) in type_args:
+                # Optional, structure(None, ...) is None
+                convert = get_converter(
+                    next(iter((t for t in type_args if t is not type(None)))))
             else:
-                if isinstance(value, property):
-                    properties[field.name] = (value, field.type)
-                else:
-                    origin = typing.get_origin(field.type)
-                    if origin is not None:
-                        type_args = typing.get_args(field.type)
-                        if origin is typing.Union:
-                            if len(type_args) == 2 and type(None) in type_args:
-                                if value is None:
-                                    args[field.name] = value
-                                else:
-                                    field_type = next(
-                                        iter((t for t in type_args
-                                              if t is not type(None))))
-                                    args[field.name] = structure(
-                                        value, field_type)
-                            else:
-                                args[field.name] = value
-                        elif origin is typing.Literal:
-                            args[field.name] = value
-                    else:
-                        args[field.name] = structure(value, field.type)
-
-        if properties:
-            new_type = type('guiml_added_properties', (data_type, ), {})
-            result = new_type(**args)
-            add_properties(new_type, properties)
-            return result
+                convert = _keep
+        elif origin is typing.Literal:
+            convert = _keep
         else:
-            return data_type(**args)
-    else:
+            convert = None
+
+        plan.append((field.name, convert))
+
+    _structure_plans[data_type] = plan
+    return plan
+
+
+def structure_dataclass(data, data_type):
+    args = dict()
+    properties = dict()
+    for name, convert in structure_plan(data_type):
         try:
-            return data_type(data)
-        except TypeError:
-            return data
+            value = data[name]
+        except KeyError:
+            pass
+        else:
+            if isinstance(value, property):
+                properties[name] = value
+            elif convert is not None:
+                args[name] = convert(value)
+
+    if properties:
+        result = bound_class(data_type, tuple(properties))(**args)
+        result._guiml_bindings = properties
+        return result
+    else:
+        return data_type(**args)
+
+
+def get_converter(data_type):
+    """
+    The function converting data to data_type, see structure.
+    """
+
+    convert = _converters.get(data_type)
+    if convert is not None:
+        return convert
+
+    if dataclasses.is_dataclass(data_type):
+        def convert(data):
+            if data is None:
+                return None
+            elif isinstance(data, data_type):
+                return data
+            else:
+                return structure_dataclass(data, data_type)
+    else:
+        def convert(data):
+            if data is None:
+                return None
+            elif isinstance(data, data_type):
+                return data
+            else:
+                try:
+                    return data_type(data)
+                except TypeError:
+                    return data
+
+    _converters[data_type] = convert
+    return convert
+
+
+_field_names = dict()
+
+
+def field_names(data_type):
+    names = _field_names.get(data_type)
+    if names is None:
+        names = tuple(field.name for field in dataclasses.fields(data_type))
+        _field_names[data_type] = names
+
+    return names
+
+
+def structure(data, data_type):
+    """
+    Convert data to data_type. Dictionaries are converted to dataclasses
+    field by field. How to convert each field is only computed once per
+    dataclass.
+    """
+
+    return get_converter(data_type)(data)
 
 
 _logged_unknown_components = set()
@@ -294,52 +902,55 @@ def log_unknown_component(tag):
         _logged_unknown_components.add(tag)
 
 
-def match_style_key(key, node_id, tag, classes):
-    items = key.split('.')
+class SelectorStats:
+    """
+    Counts how many style rules are tested when matching styles to nodes.
+    """
 
-    score = -len(items)
+    def __init__(self):
+        self.reset()
 
-    items = iter(items)
-    item = next(items)
-    if item == '':
-        item = '.' + next(items)
+    def reset(self):
+        self.nodes = 0
+        self.tested = 0
+        self.matched = 0
 
-    if item[0] == '$':
-        if item[1:] != node_id:
-            return False
-    elif item[0] == '.':
-        if item[1:] not in classes:
-            return False
-    else:
-        if item != tag:
-            return False
+    def stats(self):
+        return {
+            "nodes": self.nodes,
+            "rules_tested": self.tested,
+            "rules_matched": self.matched,
+            "rules_tested_per_node":
+                self.tested / self.nodes if self.nodes else 0.,
+        }
 
-    for item in items:
-        if item not in classes:
-            return False, score
 
-    return True, score
+selector_stats = SelectorStats()
 
 
 def get_applicable_styles(styles, node_id, name, classes):
+    """
+    The data of all style rules matching the node, in the order they should
+    be merged, i.e., the most specific rule comes last.
+    """
+
+    if not isinstance(classes, (set, frozenset)):
+        classes = set(classes)
+
     result = []
+    selector_stats.nodes += 1
+
     for i, style in enumerate(styles):
-        if node_id is not None:
-            for key, data in style.get('$' + node_id, []):
-                match, score = match_style_key(key, node_id, name, classes)
-                if match:
-                    result.append(((i, 0, score), data))
-
-        for key, data in style.get(name, []):
-            match, score = match_style_key(key, node_id, name, classes)
-            if match:
-                result.append(((i, 1, score), data))
-
-        for style_class in classes:
-            for key, data in style.get('.' + style_class, []):
-                match, score = match_style_key(key, node_id, name, classes)
-                if match:
-                    result.append(((i, 2, score), data))
+        if not isinstance(style, SelectorIndex):
+            # style given as mapping from selectors to data
+            style = SelectorIndex(style.items())
+
+        for kind, selector, data in style.candidates(node_id, name, classes):
+            selector_stats.tested += 1
+            if selector.matches(classes):
+                selector_stats.matched += 1
+                result.append(((i, kind, selector.score, selector.order),
+                               data))
 
     result.sort(key=lambda x: x[0])
     result = [x[1] for x in reversed(result)]
@@ -364,20 +975,44 @@ class ComponentManager(PersistationManager):
     @dataclass
     class Dependencies:
         ui_loop: UILoop
-        timeit: TimeIt
 
-    PERSISTANCE_KEY_ATTRIBUTE = "persistance_key"
-
-    def __init__(self, global_style=None):
+    def __init__(self, global_style=None, incremental=False,
+                 compile_templates=False, reactive=False, on_demand=False,
+                 time_budget=None):
         super().__init__()
         self.dependencies = None
         self.node_data = dict()
         self.global_style = global_style
 
+        # If incremental is set, only components that are marked dirty are
+        # renewed, see Component.mark_dirty.
+        self.incremental = incremental or reactive
+        # If reactive is set, components are marked dirty automatically when
+        # attributes used by their template change, see guiml.reactive.
+        self.reactive = reactive
+        # If on_demand is set, frames are only run when requested, see
+        # UILoop.request_frame.
+        self.on_demand = on_demand
+        # If time_budget is set, updating stops after the given number of
+        # seconds and is continued in the next frame, see on_update.
+        self.time_budget = time_budget
+        # the steps of an update that is not complete yet or None
+        self.pending_update = None
+        # maps ids of components, injectables and node data to their data
+        # node
+        self.data_nodes = dict()
+
+        # maps (tag, id, classes, ids of style data) to the style data and
+        # the resolved style, see resolve_style
+        self.style_cache = dict()
+
+        # The tree is expanded in place and kept between frames.
         self.tree = ET.fromstring("<application></application>")
+        self.control_transformer = ControlTransformer(
+            compiler=TemplateCompiler() if compile_templates else None)
         self.dynamic_dom = DynamicDOM([
             TemplatesTransformer(),
-            ControlTransformer(),
+            self.control_transformer,
             TextTransformer(),
         ])
 
@@ -389,13 +1024,29 @@ class ComponentManager(PersistationManager):
         self._update_subscription = \
             self.dependencies.ui_loop.on_update.subscribe(self.on_update)
 
+        if self.on_demand:
+            self.dependencies.ui_loop.set_on_demand(True)
+
     def on_destroy(self):
         self._update_subscription.cancel()
 
-    def collect_properties(self, node, additional_classes):
-        meta_data = _components.get(node.tag)
+    def destroy_root(self):
+        if self.pending_update is not None:
+            # The interrupted update is dropped, the last complete tree is
+            # destroyed.
+            self.pending_update.close()
+            self.pending_update = None
+
+        super().destroy_root()
 
-        data = {}
+    def resolve_style(self, node, classes):
+        """
+        Merge all styles that apply to the node. The result is cached and
+        shared by all nodes with the same tag, id, classes and styles, hence
+        it must not be modified.
+        """
+
+        meta_data = _components.get(node.tag)
 
         style_handler = [
             # Style imposed from user of this component
@@ -405,13 +1056,31 @@ class ComponentManager(PersistationManager):
             self.global_style
         ]
 
-        styles = []
-        for handler in style_handler:
-            if handler is not None:
-                data = handler.get().data
-                if data is not None:
-                    styles.append(data)
+        handler_data = tuple(
+            handler.get().data if handler is not None else None
+            for handler in style_handler)
+
+        # The cached entry keeps the style data alive, so their ids can not
+        # be reused while the entry exists. Reloading a style file replaces
+        # its data.
+        key = (node.tag, node.get("id"), frozenset(classes),
+               tuple(id(data) for data in handler_data))
 
+        cached = self.style_cache.get(key)
+        if cached is not None:
+            return cached[1]
+
+        styles = [style for style in handler_data if style is not None]
+
+        layers = [{}]
+        layers.extend(get_applicable_styles(styles, node.get("id"), node.tag,
+                                            classes))
+        data = merge_layers(layers)
+
+        self.style_cache[key] = (handler_data, data)
+        return data
+
+    def collect_properties(self, node, additional_classes):
         classes = set()
 
         if additional_classes:
@@ -426,9 +1095,7 @@ class ComponentManager(PersistationManager):
             if key.startswith(prefix) and value():
                 classes.add(key[len(prefix):])
 
-        for node_styles in get_applicable_styles(styles, node.get("id"), node.tag, classes):
-            data = merge_data(data, node_styles)
-
+        data = self.resolve_style(node, classes)
         data = merge_data(data, node.attrib)
 
         return data
@@ -491,9 +1158,21 @@ class ComponentManager(PersistationManager):
     def create_data(self, node, parent_nodes):
         result = NodeObjects()
 
+        providers = None
+        scopes = None
+        if parent_nodes:
+            parent_data = self.node_data[parent_nodes[-1]]
+            providers = parent_data.providers
+            scopes = parent_data.scopes
+
         injector = Injector(
-            [self.node_data[parent].injectables for parent in parent_nodes])
-        result.injectables = injector.add_tag(node.tag)
+            providers=providers,
+            on_create=functools.partial(self.on_injectable_created, result),
+            scopes=scopes)
+        result.injectables = injector.add_tag(node.tag, owner=result)
+        result.providers = injector.providers
+        result.scopes = injector.scopes
+        result.shared = injector.shared
         if node.tag == "application" and self.dependencies is None:
             self.dependencies = injector.get_dependencies(self)
             self.on_init()
@@ -508,28 +1187,333 @@ class ComponentManager(PersistationManager):
 
         return result
 
+    def on_injectable_created(self, data, injectable):
+        # Lazy injectables are created when they are requested, possibly long
+        # after the node providing them.
+        data_node = self.data_nodes.get(id(data))
+        if data_node is not None:
+            self.data_nodes[id(injectable)] = data_node
+
+    def find_data_node(self, obj):
+        data_node = self.data_nodes.get(id(obj))
+        if data_node is None:
+            # Shared injectables renew the node defining their scope.
+            scope = getattr(obj, "_guiml_scope", None)
+            if scope is not None:
+                data_node = self.data_nodes.get(id(scope.owner), self.root)
+
+        return data_node
+
     def destroy_data(self, data):
+        self.data_nodes.pop(id(data), None)
+        if data.component is not None:
+            self.data_nodes.pop(id(data.component), None)
+            reactive.forget(data.component)
+        if data.injectables:
+            for injectable in data.injectables.values():
+                self.data_nodes.pop(id(injectable), None)
+
         data.on_destroy()
 
+    @dataclass(eq=False)
+    class Frame(PersistationManager.Frame):
+        # records the reads while renewing the node, see reactive
+        recording: Optional[reactive.Recording] = None
+
+    def iter_traverse(self, node, restored_data, parent_nodes):
+        steps = super().iter_traverse(node, restored_data, parent_nodes)
+        if not self.reactive:
+            return (yield from steps)
+
+        # Restores the recording of reads if renewing fails or is stopped.
+        with reactive.track():
+            while True:
+                try:
+                    next(steps)
+                except StopIteration as stop:
+                    return stop.value
+
+                # Reads in between, e.g., by event handlers, do not belong
+                # to the components that are renewed.
+                reads = reactive.pause()
+                yield
+                reactive.resume(reads)
+
+    def enter_node(self, node, restored_data, parent_nodes):
+        recording = None
+        if self.reactive:
+            # Everything read while renewing the subtree, except inside of
+            # child components, is a dependency of the component.
+            recording = reactive.start()
+
+        frame = super().enter_node(node, restored_data, parent_nodes)
+        frame.recording = recording
+        return frame
+
+    def leave_node(self, frame, parent_nodes):
+        data_node = super().leave_node(frame, parent_nodes)
+        data = data_node.data
+
+        if frame.recording is not None:
+            frame.recording.owner = data.component
+            reactive.stop(frame.recording)
+
+        # The children are renewed already, so the layout tree is built
+        # bottom up.
+        data.layout_children = self.get_layout_children(frame.node)
+
+        if frame.created:
+            self.data_nodes[id(data)] = data_node
+            if data.component is not None:
+                self.data_nodes[id(data.component)] = data_node
+            if data.injectables:
+                for injectable in data.injectables.values():
+                    self.data_nodes[id(injectable)] = data_node
+
+        return data_node
+
+    def iter_renew_data_node(self, data_node, parent_nodes):
+        # The subtree will be expanded again, forget about the old nodes.
+        for node in data_node.node.iter():
+            self.node_data.pop(node, None)
+
+        yield from super().iter_renew_data_node(data_node, parent_nodes)
+
+    def iter_renew_children(self, data_node, parent_nodes, nodes):
+        for node in nodes:
+            for descendant in node.iter():
+                self.node_data.pop(descendant, None)
+
+        yield from super().iter_renew_children(data_node, parent_nodes, nodes)
+
+    def get_parent_nodes(self, data_node):
+        """
+        The nodes from the root to the parent of the node of data_node, or
+        None if the node is not part of the tree anymore.
+        """
+
+        parent_nodes = list()
+        while data_node.parent is not None:
+            parent = data_node.parent
+            if not any(child is data_node.node for child in parent.node):
+                return None
+            parent_nodes.append(parent.node)
+            data_node = parent
+
+        if data_node is not self.root:
+            return None
+
+        parent_nodes.reverse()
+        return parent_nodes
+
+    def iter_patch(self, expansion):
+        """
+        Expand the changes of the ObservableList of a for control and renew
+        only the affected children, see ControlTransformer.patch.
+        """
+
+        target = expansion.target
+        data = self.node_data.get(target)
+        data_node = self.data_nodes.get(id(data))
+        parent_nodes = None
+        if data_node is not None and data_node.node is target:
+            parent_nodes = self.get_parent_nodes(data_node)
+
+        if parent_nodes is None:
+            # The target was removed, it is expanded again if it is restored.
+            expansion.close()
+            return
+
+        recording = None
+        if self.reactive:
+            # Reads of the new children are dependencies of the component
+            # with the for control, in addition to the ones of its last renew.
+            recording = reactive.start()
+        try:
+            nodes = self.control_transformer.patch(expansion)
+        finally:
+            if recording is not None:
+                recording.owner = expansion.context["self"]
+                reactive.stop(recording, replace=False)
+
+        if nodes is None:
+            return
+
+        yield from self.iter_renew_children(data_node, parent_nodes, nodes)
+
+        data.layout_children = self.get_layout_children(target)
+        data.relayout = True
+        data.dirty_descendants = True
+        self.update_ancestors(data_node)
+
+    def update_ancestors(self, data_node):
+        """
+        Update the layout children of the ancestors of a renewed data node and
+        mark them for layout.
+        """
+
+        # Renewed nodes that are not placed themselves pass their layout
+        # children on to the parent.
+        parent = data_node.parent
+        while parent is not None:
+            parent.data.layout_children = \
+                self.get_layout_children(parent.node)
+            if self.is_layout_child(parent.data):
+                break
+            parent = parent.parent
+
+        parent = data_node.parent
+        while (parent is not None
+               and not parent.data.dirty_descendants):
+            parent.data.dirty_descendants = True
+            parent = parent.parent
+
+    def patch_properties(self, component, properties):
+        """
+        Update the properties of the component in place with the values of
+        properties and notify the component about changed fields.
+        """
+
+        old = component.properties
+        if type(old) is not type(properties):
+            component.properties = properties
+            component.on_properties_changed(set(field_names(type(properties))))
+            return
+
+        # Bound fields are read from the bindings and can not be compared.
+        bindings = properties.__dict__.get("_guiml_bindings", ())
+
+        changed = set()
+        for name in field_names(type(properties)):
+            if name in bindings:
+                continue
+
+            value = getattr(properties, name)
+            old_value = getattr(old, name)
+            if value is not old_value:
+                if value != old_value:
+                    changed.add(name)
+                setattr(old, name, value)
+
+        if bindings:
+            old._guiml_bindings = bindings
+
+        if changed:
+            component.on_properties_changed(changed)
+
+    def on_data_parked(self, data):
+        if data.component:
+            data.component.on_hide()
+
+    def on_data_unparked(self, data):
+        if data.component:
+            data.component.on_show()
+
+    def recycle_limit(self, data, node):
+        if data.component is None:
+            return 0
+
+        meta_data = _components.get(node.tag)
+        return meta_data.recycle if meta_data is not None else 0
+
+    def on_data_recycled(self, data, node, parent_nodes):
+        component = data.component
+        component.on_recycle(
+            self.make_properties(type(component), node, parent_nodes,
+                                 component.style_classes.get()))
+
     def on_data_restored(self, data, node, parent_nodes):
         if data.component:
-            # todo: do we really want to overwrite the properties every time?
-            data.component.properties = self.make_properties(
-                type(data.component), node, parent_nodes,
-                data.component.style_classes.get())
+            self.patch_properties(
+                data.component,
+                self.make_properties(type(data.component), node, parent_nodes,
+                                     data.component.style_classes.get()))
 
     # @timeit('renew > ')
     def on_data_renewed(self, data, node, parent_nodes):
         self.renew_layout(data)
         self.node_data[node] = data
+        if data.component is not None:
+            data.initial_position = copy.copy(
+                getattr(data.component.properties, 'position', None))
+            # The component is renewed now, pending changes are included.
+            clear_dirty(data.component)
+        data.renewed = True
+
         self.dynamic_dom.update(node, data.component)
 
     def on_update(self, dt):
-        reload_resources()
-        tree = copy.deepcopy(self.tree)
+        """
+        Renew the tree and compute its layout. If a time budget is set, the
+        update is interrupted when the budget is used up and continued in the
+        next frame. Windows keep showing the last complete frame meanwhile,
+        but the components are renewed in place, so event handlers that run
+        in between may see a partially renewed tree.
+        """
 
-        self.node_data = dict()
-        self.renew(tree)
+        if self.pending_update is None:
+            self.pending_update = self.iter_update()
+
+        try:
+            if self.time_budget is None:
+                run_steps(self.pending_update)
+                self.pending_update = None
+            else:
+                deadline = time.perf_counter() + self.time_budget
+                for _ in self.pending_update:
+                    if time.perf_counter() >= deadline:
+                        break
+                else:
+                    self.pending_update = None
+        except Exception:
+            # The failed update can not be continued, the next frame starts a
+            # new one.
+            self.pending_update = None
+            raise
+
+        if self.dependencies is not None:
+            self.dependencies.ui_loop.frame_complete = \
+                self.pending_update is None
+
+    def iter_update(self):
+        """
+        The steps of on_update, yielding after each renewed node.
+        """
+
+        resources_changed = reload_resources()
+        dirty = pop_dirty()
+
+        if resources_changed:
+            self.style_cache = dict()
+
+        if (self.incremental and self.root is not None
+                and not resources_changed):
+            # changed ObservableLists of for controls, which are patched
+            expansions = [obj for obj in dirty
+                          if isinstance(obj, ForExpansion)]
+            data_nodes = [
+                data_node for data_node in map(self.find_data_node, dirty)
+                if data_node is not None
+            ]
+
+            if not data_nodes and not expansions:
+                return
+
+            yield from self.iter_renew_data_nodes(data_nodes)
+
+            for data_node in data_nodes:
+                self.update_ancestors(data_node)
+
+            # Expansions of renewed components are outdated and skipped.
+            for expansion in expansions:
+                yield from self.iter_patch(expansion)
+        else:
+            # Nodes are only found again once they are renewed, also while
+            # renewing is suspended.
+            self.node_data = dict()
+            yield from self.iter_renew(self.tree)
+
+        tree = self.tree
 
         # self.dump_tree(tree)
 
@@ -563,37 +1547,193 @@ class ComponentManager(PersistationManager):
         data = self.node_data.get(node)
         return data.layout if data else None
 
+    def is_layout_child(self, data):
+        """
+        If the component of data is placed by the layout of its parent, or
+        if its children are placed instead.
+        """
+
+        component = data.component
+        return (component is not None
+                and getattr(component.properties, 'layout', True))
+
     def get_layout_children(self, node):
+        """
+        The data of all children that are placed by the layout of node. The
+        layout children of the children of node must be up to date.
+        """
+
         childs = list()
         for child in node:
             child_data = self.node_data.get(child)
-            if child_data and child_data.component:
-                if getattr(child_data.component.properties, 'layout', True):
-                    childs.append(child_data.component)
-                    continue
+            if child_data is None:
+                continue
 
-            childs.extend(self.get_layout_children(child))
+            if self.is_layout_child(child_data):
+                childs.append(child_data)
+            elif child_data.layout_children:
+                childs.extend(child_data.layout_children)
         return childs
 
+    def needs_layout(self, data):
+        return data is not None and (data.renewed or data.dirty_descendants)
+
     def compute_recommended_size(self, node):
-        layouter = self.get_layouter(node)
+        """
+        Measure the renewed nodes and their ancestors, as long as the measured
+        size changes. The tree is traversed with an explicit stack.
 
-        for child in node:
-            self.compute_recommended_size(child)
+        Returns:
+            bool: if the layout of the parent of node needs to be computed
+                again, see measure
+        """
+
+        data = self.node_data.get(node)
+        if not self.needs_layout(data):
+            return False
+
+        # entries are [node, data, iterator over the children, if the
+        # layout of a child changed]
+        stack = [[node, data, iter(node), False]]
+        while True:
+            entry = stack[-1]
+            child = next(entry[2], None)
+            if child is not None:
+                child_data = self.node_data.get(child)
+                if self.needs_layout(child_data):
+                    stack.append([child, child_data, iter(child), False])
+                continue
+
+            stack.pop()
+            changed = self.measure(entry[1], entry[3])
+            if not stack:
+                return changed
+
+            if changed:
+                stack[-1][3] = True
+
+    def measure(self, data, children_changed):
+        """
+        Measure the node of data, after its children are measured.
+
+        Returns:
+            bool: if the layout of the parent needs to be computed again,
+                because the node was renewed or its size changed
+        """
+
+        # The children of nodes with patched for controls changed.
+        children_changed = children_changed or data.relayout
+        if not (data.renewed or children_changed):
+            return False
+
+        placed = None
+        if data.layout and (data.renewed or children_changed):
+            if not data.renewed:
+                # The size is computed from the position given by the
+                # properties, not from the one of the last layout.
+                placed = data.component.properties.position
+                data.component.properties.position = \
+                    copy.copy(data.initial_position)
+
+            data.layout.compute_recommended_size(
+                [child.component for child in data.layout_children])
+            data.relayout = True
+
+        if not self.is_layout_child(data):
+            return data.renewed or children_changed
+
+        component = data.component
+        measured = (copy.copy(getattr(component.properties, 'position', None)),
+                    getattr(component, 'width', None),
+                    getattr(component, 'height', None))
+        changed = data.renewed or measured != data.measured
+        data.measured = measured
 
-        if layouter:
-            layouter.compute_recommended_size(self.get_layout_children(node))
+        if placed is not None and not changed:
+            # The parent does not place the component again.
+            component.properties.position = placed
+
+        return changed
 
     def layout(self, node):
-        layouter = self.get_layouter(node)
-        if layouter:
-            layouter.layout(self.get_layout_children(node))
+        """
+        Place the children of nodes that were measured again or moved.
+        Subtrees that did not change keep the positions of the last layout.
+        The tree is traversed with an explicit stack.
+        """
+
+        stack = [(node, ())]
+        while stack:
+            node, moved = stack.pop()
+            children_moved = self.place_children(self.node_data.get(node),
+                                                 moved)
+            if children_moved is not None:
+                stack.extend((child, children_moved)
+                             for child in reversed(node))
+
+    def place_children(self, data, moved):
+        """
+        Place the layout children of the node of data if necessary.
+
+        Args:
+            moved: ids of the data of layout children, which were placed at
+                a different position than before
+
+        Returns:
+            the ids of the data of moved layout children for the children of
+            the node, or None if the children do not need to be visited
+        """
 
-        for child in node:
-            self.layout(child)
+        if data is None:
+            return None
+
+        is_moved = id(data) in moved
+        is_layout_child = self.is_layout_child(data)
+        if not (is_moved or data.renewed or data.dirty_descendants
+                or (moved and not is_layout_child)):
+            return None
+
+        if not is_layout_child:
+            # children are placed by the layout of the parent
+            children_moved = moved
+        else:
+            children_moved = ()
+
+        if data.layout and (is_moved or data.relayout):
+            children = data.layout_children
+            placed = [child.component.properties.position
+                      for child in children]
 
+            for child in children:
+                child.component.properties.position = \
+                    copy.copy(child.measured[0])
 
-def run(interval=1/30, global_style=None):
-    manager = ComponentManager(global_style)  # noqa: F841
-    app.run(interval=interval)
+            data.layout.layout([child.component for child in children])
+
+            children_moved = set(
+                id(child) for child, position in zip(children, placed)
+                if child.component.properties.position != position)
+
+        data.renewed = False
+        data.dirty_descendants = False
+        data.relayout = False
+
+        return children_moved
+
+
+def run(interval=1/30, global_style=None, incremental=False,
+        compile_templates=False, reactive=False, on_demand=False,
+        time_budget=None):
+    manager = ComponentManager(global_style, incremental,  # noqa: F841
+                               compile_templates, reactive, on_demand,
+                               time_budget)
+
+    if on_demand:
+        # The interval limits how often frames run, windows are only redrawn
+        # after a frame.
+        manager.dependencies.ui_loop.active_rate = interval
+        manager.dependencies.ui_loop.set_active_update_rate()
+        app.run(interval=None)
+    else:
+        app.run(interval=interval)
     manager.destroy_root()
@@ -0,0 +1,51 @@
+_dirty = dict()
+
+# callbacks that are called when an object is marked dirty
+_listeners = list()
+
+
+def mark_dirty(obj):
+    """
+    Mark a component or injectable as changed, so that it is renewed in the
+    next frame when rendering incrementally.
+    """
+
+    _dirty[id(obj)] = obj
+
+    for listener in _listeners:
+        listener()
+
+
+def pop_dirty():
+    """
+    Return all objects marked dirty since the last call.
+    """
+
+    global _dirty
+    result = _dirty
+    _dirty = dict()
+    return list(result.values())
+
+
+def clear_dirty(obj):
+    """
+    Forget that obj was marked dirty, e.g., because it is renewed right now.
+    """
+
+    _dirty.pop(id(obj), None)
+
+
+def has_dirty():
+    return bool(_dirty)
+
+
+def subscribe_dirty(callback):
+    """
+    Call callback without arguments whenever an object is marked dirty.
+    """
+
+    _listeners.append(callback)
+
+
+def unsubscribe_dirty(callback):
+    _listeners.remove(callback)
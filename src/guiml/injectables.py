@@ -9,7 +9,18 @@ import time
 from pyglet import clock
 
 from guiml.registry import injectable
-from guiml.registry import _injectables
+from guiml.registry import (
+    _injectables,
+    _lazy_injectables,
+    _injectable_scopes,
+)
+from guiml.dirty import (
+    mark_dirty,
+    has_dirty,
+    subscribe_dirty,
+    unsubscribe_dirty,
+)
+from guiml.resources import resources_modified
 from contextlib import contextmanager
 
 
@@ -31,6 +42,13 @@ class Injectable:
     def on_destroy(self):
         pass
 
+    def mark_dirty(self):
+        """
+        Request that the component providing this injectable and all its
+        children are renewed in the next frame, when rendering incrementally.
+        """
+        mark_dirty(self)
+
 
 class CyclicDependencyError(RuntimeError):
     pass
@@ -40,18 +58,28 @@ def get_dependency_class(injectable):
     return injectable.Dependencies
 
 
+# maps dependency classes to the list of (field name, resolved type)
+_dependency_fields = dict()
+
+
+def get_dependency_fields(dependency_class):
+    fields = _dependency_fields.get(dependency_class)
+    if fields is None:
+        resolved_types = typing.get_type_hints(dependency_class)
+        fields = [(field.name, resolved_types[field.name])
+                  for field in dataclasses.fields(dependency_class)]
+        _dependency_fields[dependency_class] = fields
+
+    return fields
+
+
 def get_dependencies(injectable, with_name=False):
-    dependency_class = get_dependency_class(injectable)
-    resolved_types = typing.get_type_hints(dependency_class)
+    fields = get_dependency_fields(get_dependency_class(injectable))
 
     if with_name:
-        return [(field.name, resolved_types[field.name])
-                for field in dataclasses.fields(dependency_class)]
+        return fields
     else:
-        return [
-            resolved_types[field.name]
-            for field in dataclasses.fields(dependency_class)
-        ]
+        return [field_type for _, field_type in fields]
 
 
 class DependencyResolver:
@@ -86,7 +114,9 @@ class DependencyResolver:
                 return
         else:
             for child in node.dependencies:
-                self.visit(self.nodes[child])
+                # dependencies of other tags are provided by a parent
+                if child in self.nodes:
+                    self.visit(self.nodes[child])
 
             node.t_visit = self.t
             self.t += 1
@@ -96,21 +126,167 @@ class DependencyResolver:
         return iter((node.injectable for node in dag_order))
 
 
-class Injector:
+# maps tags to the number of injectables registered for the tag and the
+# order in which they are created
+_creation_orders = dict()
 
-    def __init__(self, injectables):
-        # list of dicts mapping injectable classes to its instance
+
+def get_creation_order(tag):
+    """
+    The injectables provided by tag, such that each injectable comes after
+    its dependencies.
+    """
+
+    registered = _injectables.get(tag, ())
+    cached = _creation_orders.get(tag)
+    # injectables are only ever added to the registry
+    if cached is None or cached[0] != len(registered):
+        cached = (len(registered), tuple(DependencyResolver(registered)))
+        _creation_orders[tag] = cached
+
+    return cached[1]
+
+
+class Scope:
+    """
+    Injectables shared by all nodes within a window, an application or the
+    process. A shared injectable is destroyed when the last node using it is
+    destroyed.
+    """
+
+    def __init__(self, owner=None):
+        # the data of the node defining the scope, None for the process
+        self.owner = owner
+        # maps injectable classes to the shared instance and the number of
+        # nodes using it
+        self.shared = dict()
+
+    def acquire(self, injectable_cls, create):
+        entry = self.shared.get(injectable_cls)
+        if entry is None:
+            instance = create()
+            instance._guiml_scope = self
+            entry = [instance, 0]
+            self.shared[injectable_cls] = entry
+
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, instance):
+        entry = self.shared[type(instance)]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self.shared[type(instance)]
+            instance.on_destroy()
+
+
+process_scope = Scope()
+
+
+class LazyInjectable:
+    """
+    Placeholder for an injectable registered with lazy=True, which creates
+    the injectable when it is requested for the first time.
+    """
+
+    def __init__(self, injectable_cls, injector, injectables):
+        self.injectable_cls = injectable_cls
+        # the injector of the node providing the injectable
+        self.injector = injector
+        # the injectables created for the node providing the injectable
         self.injectables = injectables
+        self.instance = None
+
+    def get(self):
+        if self.instance is None:
+            self.instance = self.injector.create(self.injectable_cls,
+                                                 self.injectables)
+
+        return self.instance
+
+
+class Injector:
+
+    def __init__(self, injectables=None, providers=None, on_create=None,
+                 scopes=None):
+        """
+        Args:
+            injectables: list of dicts mapping injectable classes to its
+                instance, later dicts take precedence
+            providers: a single dict mapping injectable classes to its
+                instance, it is not modified
+            on_create: called with each injectable created for the node,
+                lazy injectables are created when they are first requested
+            scopes: dict mapping scope names to the Scope the node belongs
+                to, it is not modified
+        """
+
+        if providers is None:
+            providers = dict()
+            for layer in injectables or ():
+                providers.update(layer)
+
+        if scopes is None:
+            scopes = {"process": process_scope}
+
+        # maps injectable classes to its instance or LazyInjectable, shared
+        # with the injector of the parent until an injectable is added
+        self.providers = providers
+        self.on_create = on_create
+        self.scopes = scopes
+        # shared injectables used by this injector, they need to be released
+        # instead of destroyed
+        self.shared = list()
+
+    def create(self, injectable_cls, result):
+        """
+        Create the injectable and add it to result, or add a reference to
+        the shared instance if the injectable has a scope.
+        """
+
+        scope = self.scopes.get(_injectable_scopes.get(injectable_cls))
+        if scope is None:
+            instance = injectable_cls(self.get_dependencies(injectable_cls))
+            result[injectable_cls] = instance
+
+            if self.on_create is not None:
+                self.on_create(instance)
+        else:
+            instance = scope.acquire(
+                injectable_cls,
+                lambda: injectable_cls(self.get_dependencies(injectable_cls)))
+            self.shared.append(instance)
+
+        return instance
+
+    def add_tag(self, tag, owner=None):
+        """
+        Create the injectables provided by tag. Window and application tags
+        start a new scope, owner is the data of the node defining it.
+
+        Returns:
+            dict: mapping injectable classes to the created instances, lazy
+                injectables are added when they are created
+        """
+
+        if tag in ("window", "application"):
+            self.scopes = {**self.scopes, tag: Scope(owner)}
 
-    def add_tag(self, tag):
         result = dict()
-        self.injectables.append(result)
+        copied = False
 
-        to_add = DependencyResolver(_injectables[tag])
-        for injectable_cls in to_add:
+        for injectable_cls in get_creation_order(tag):
             if injectable_cls not in self:
-                result[injectable_cls] = injectable_cls(
-                    self.get_dependencies(injectable_cls))
+                if not copied:
+                    self.providers = dict(self.providers)
+                    copied = True
+
+                if injectable_cls in _lazy_injectables:
+                    self.providers[injectable_cls] = LazyInjectable(
+                        injectable_cls, self, result)
+                else:
+                    self.providers[injectable_cls] = self.create(
+                        injectable_cls, result)
 
         return result
 
@@ -123,19 +299,14 @@ class Injector:
         return get_dependency_class(class_with_dependencies)(**args)
 
     def __contains__(self, key):
-        for layer in reversed(self.injectables):
-            if key in layer:
-                return True
-        return False
+        return key in self.providers
 
     def __getitem__(self, key):
-        for layer in reversed(self.injectables):
-            try:
-                return layer[key]
-            except KeyError:
-                pass
+        value = self.providers[key]
+        if isinstance(value, LazyInjectable):
+            return value.get()
 
-        raise KeyError(key)
+        return value
 
 
 class Subscription:
@@ -143,9 +314,21 @@ class Subscription:
     def __init__(self, observable, callback):
         self.observable = observable
         self.callback = callback
+        self.active = True
 
     def cancel(self):
-        self.observable.unsubscribe(self.callback)
+        if self.active:
+            self.active = False
+            self.observable.unsubscribe(self.callback)
+
+    def resume(self):
+        """
+        Subscribe again after the subscription was canceled.
+        """
+
+        if not self.active:
+            self.active = True
+            self.observable.callbacks.append(self.callback)
 
 
 class Observable:
@@ -159,7 +342,8 @@ class Observable:
         if self.pre_call is not None:
             self.pre_call(*args, **kwargs)
 
-        for callback in self.callbacks:
+        # Callbacks may cancel their subscription while being called.
+        for callback in tuple(self.callbacks):
             callback(*args, **kwargs)
 
         if self.post_call is not None:
@@ -193,6 +377,11 @@ class Subscriber:
         for subscription in subscriptions:
             subscription.cancel()
 
+    def resume_subscriptions(self):
+        subscriptions = getattr(self, '_subscriptions')
+        for subscription in subscriptions:
+            subscription.resume()
+
 
 @dataclass
 class TimeRecords:
@@ -232,7 +421,7 @@ class TimeRecords:
 timeit = TimeRecords()
 
 
-@injectable("application")
+@injectable("application", lazy=True)
 class TimeIt(Injectable):
     def on_init(self):
         super().on_init()
@@ -254,9 +443,32 @@ class UILoop(Injectable):
     def on_init(self):
         self.active_rate = 1/30
         self.inactive_rate = 1.
+        # interval to check for changed resource files when running on demand
+        self.resource_check_rate = 1.
         self.on_update = Observable()
+
+        # If on_demand is set, frames only run after request_frame was called
+        # and the update rate is the minimal time between two frames.
+        self.on_demand = False
+        self.rate = None
+        self.last_frame = None
+        self.frame_requested = False
+        self.updating = False
+        # If the last frame completed the update of the components. Otherwise
+        # the update continues in the next frame, see ComponentManager.
+        self.frame_complete = True
+        self.timers = dict()
+
+        subscribe_dirty(self.request_frame)
         self.set_active_update_rate()
 
+    def on_destroy(self):
+        unsubscribe_dirty(self.request_frame)
+        clock.unschedule(self._update)
+        clock.unschedule(self._check_resources)
+        for timer in self.timers.values():
+            clock.unschedule(timer)
+
     def set_active_update_rate(self):
         self.set_update_rate(self.active_rate)
 
@@ -264,12 +476,99 @@ class UILoop(Injectable):
         self.set_update_rate(self.inactive_rate)
 
     def set_update_rate(self, rate):
+        self.rate = rate
         clock.unschedule(self._update)
-        if rate is None:
+        self.frame_requested = False
+
+        if self.on_demand:
+            self.request_frame()
+        elif rate is None:
             clock.schedule(self._update)
         else:
             clock.schedule_interval(self._update, rate)
 
+    def set_on_demand(self, on_demand):
+        """
+        Switch between running frames at the update rate and running frames
+        only on request.
+        """
+
+        self.on_demand = on_demand
+
+        clock.unschedule(self._check_resources)
+        if on_demand:
+            clock.schedule_interval(self._check_resources,
+                                    self.resource_check_rate)
+
+        self.set_update_rate(self.rate)
+
+    def request_frame(self):
+        """
+        Request that a frame is run when running on demand. Frames are run at
+        most at the update rate and multiple requests are combined into one
+        frame.
+        """
+
+        if not self.on_demand or self.frame_requested or self.updating:
+            return
+
+        self.frame_requested = True
+
+        delay = 0.
+        if self.rate is not None and self.last_frame is not None:
+            delay = max(0., self.last_frame + self.rate - time.perf_counter())
+
+        clock.schedule_once(self._update, delay)
+
+    def schedule_once(self, callback, delay, *args, **kwargs):
+        """
+        Like pyglet.clock.schedule_once, but requests a frame after the
+        callback was called.
+        """
+
+        self._schedule(clock.schedule_once, callback, delay, *args, **kwargs)
+
+    def schedule_interval(self, callback, interval, *args, **kwargs):
+        """
+        Like pyglet.clock.schedule_interval, but requests a frame after each
+        call of the callback.
+        """
+
+        self._schedule(clock.schedule_interval, callback, interval, *args,
+                       **kwargs)
+
+    def unschedule(self, callback):
+        timer = self.timers.pop(callback, None)
+        if timer is not None:
+            clock.unschedule(timer)
+
+    def _schedule(self, schedule, callback, delay, *args, **kwargs):
+        self.unschedule(callback)
+
+        def timer(dt, *args, **kwargs):
+            try:
+                callback(dt, *args, **kwargs)
+            finally:
+                self.request_frame()
+
+        self.timers[callback] = timer
+        schedule(timer, delay, *args, **kwargs)
+
+    def _check_resources(self, dt):
+        if resources_modified():
+            self.request_frame()
+
     def _update(self, dt):
+        self.frame_requested = False
+        self.last_frame = time.perf_counter()
+
         timeit.reset()
-        self.on_update(dt)
+        self.updating = True
+        try:
+            self.on_update(dt)
+        finally:
+            self.updating = False
+
+        # Objects marked dirty while updating, are not handled yet.
+        if has_dirty() or not self.frame_complete:
+            self.request_frame()
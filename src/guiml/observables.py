@@ -0,0 +1,286 @@
+import weakref
+
+from collections import namedtuple
+
+from guiml.injectables import Observable
+from guiml import reactive
+
+INSERT = "insert"
+REMOVE = "remove"
+MOVE = "move"
+UPDATE = "update"
+
+# For lists, index is the position of the change and value is
+#   insert: the list of inserted items
+#   remove: the number of removed items
+#   move: the index the item is moved to, after removing it from index
+#   update: the new item
+# For dicts, index is the key and value is the new value or None if the key
+# is removed.
+Change = namedtuple("Change", "kind index value")
+
+# name of the reads recorded for the items of a collection, see reactive
+ITEMS = "[]"
+
+
+class WeakCallback:
+    """
+    Callback that calls the method as long as its object is alive and
+    cancels its subscription afterwards, such that subscribing does not keep
+    the object alive.
+    """
+
+    def __init__(self, method):
+        self.method = weakref.WeakMethod(method)
+        self.subscription = None
+
+    def __call__(self, *args, **kwargs):
+        method = self.method()
+        if method is not None:
+            method(*args, **kwargs)
+        elif self.subscription is not None:
+            self.subscription.cancel()
+
+    def subscribe(self, observable):
+        self.subscription = observable.subscribe(self)
+        return self.subscription
+
+
+class ObservableList(list):
+    """
+    A list that emits a Change for every modification through on_change.
+    Iterating over it in a for control only expands the changed items again,
+    instead of the whole list.
+
+    Reading the list while a component is renewed is recorded like reading
+    an attribute of a Reactive object, so that modifying the list marks the
+    component dirty.
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.on_change = Observable()
+
+    def notify(self, kind, index, value):
+        self.on_change(Change(kind, index, value))
+        reactive.changed(self, ITEMS)
+
+    def reset(self, old_length):
+        """
+        Notify that all items may have changed.
+        """
+
+        if old_length:
+            self.notify(REMOVE, 0, old_length)
+        if list.__len__(self):
+            self.notify(INSERT, 0, list.__getitem__(self, slice(None)))
+
+    def __iter__(self):
+        reactive.read(self, ITEMS)
+        return super().__iter__()
+
+    def __reversed__(self):
+        reactive.read(self, ITEMS)
+        return super().__reversed__()
+
+    def __len__(self):
+        reactive.read(self, ITEMS)
+        return super().__len__()
+
+    def __getitem__(self, index):
+        reactive.read(self, ITEMS)
+        return super().__getitem__(index)
+
+    def __contains__(self, item):
+        reactive.read(self, ITEMS)
+        return super().__contains__(item)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            old_length = list.__len__(self)
+            super().__setitem__(index, value)
+            self.reset(old_length)
+        else:
+            index = self.normalize_existing(index)
+            super().__setitem__(index, value)
+            self.notify(UPDATE, index, value)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            old_length = list.__len__(self)
+            start, stop, step = index.indices(old_length)
+            super().__delitem__(index)
+            if step == 1:
+                if stop > start:
+                    self.notify(REMOVE, start, stop - start)
+            else:
+                self.reset(old_length)
+        else:
+            index = self.normalize_existing(index)
+            super().__delitem__(index)
+            self.notify(REMOVE, index, 1)
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __imul__(self, count):
+        old_length = list.__len__(self)
+        super().__imul__(count)
+        self.reset(old_length)
+        return self
+
+    def normalize(self, index):
+        """
+        The index clamped to the list like list.insert does.
+        """
+
+        length = list.__len__(self)
+        if index < 0:
+            index += length
+        return min(max(index, 0), length)
+
+    def normalize_existing(self, index):
+        length = list.__len__(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("list index out of range")
+        return index
+
+    def append(self, item):
+        self.insert(list.__len__(self), item)
+
+    def extend(self, items):
+        items = list(items)
+        if items:
+            index = list.__len__(self)
+            super().extend(items)
+            self.notify(INSERT, index, items)
+
+    def insert(self, index, item):
+        index = self.normalize(index)
+        super().insert(index, item)
+        self.notify(INSERT, index, [item])
+
+    def pop(self, index=-1):
+        index = self.normalize_existing(index)
+        item = super().pop(index)
+        self.notify(REMOVE, index, 1)
+        return item
+
+    def remove(self, item):
+        del self[list.index(self, item)]
+
+    def clear(self):
+        old_length = list.__len__(self)
+        super().clear()
+        if old_length:
+            self.notify(REMOVE, 0, old_length)
+
+    def move(self, index, destination):
+        """
+        Move the item at index, such that it is at destination afterwards.
+        """
+
+        index = self.normalize_existing(index)
+        item = super().pop(index)
+        destination = self.normalize(destination)
+        super().insert(destination, item)
+        self.notify(MOVE, index, destination)
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.reset(list.__len__(self))
+
+    def reverse(self):
+        super().reverse()
+        self.reset(list.__len__(self))
+
+
+class ObservableDict(dict):
+    """
+    A dict that emits a Change for every modification through on_change.
+    Reads are recorded like for ObservableList.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_change = Observable()
+
+    def notify(self, kind, key, value):
+        self.on_change(Change(kind, key, value))
+        reactive.changed(self, ITEMS)
+
+    def __iter__(self):
+        reactive.read(self, ITEMS)
+        return super().__iter__()
+
+    def __len__(self):
+        reactive.read(self, ITEMS)
+        return super().__len__()
+
+    def __getitem__(self, key):
+        reactive.read(self, ITEMS)
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        reactive.read(self, ITEMS)
+        return super().__contains__(key)
+
+    def get(self, key, default=None):
+        reactive.read(self, ITEMS)
+        return super().get(key, default)
+
+    def keys(self):
+        reactive.read(self, ITEMS)
+        return super().keys()
+
+    def values(self):
+        reactive.read(self, ITEMS)
+        return super().values()
+
+    def items(self):
+        reactive.read(self, ITEMS)
+        return super().items()
+
+    def __setitem__(self, key, value):
+        kind = UPDATE if dict.__contains__(self, key) else INSERT
+        super().__setitem__(key, value)
+        self.notify(kind, key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.notify(REMOVE, key, None)
+
+    def pop(self, key, *default):
+        if not dict.__contains__(self, key):
+            return super().pop(key, *default)
+
+        value = super().pop(key)
+        self.notify(REMOVE, key, None)
+        return value
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.notify(REMOVE, key, None)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if not dict.__contains__(self, key):
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        keys = list(dict.keys(self))
+        super().clear()
+        for key in keys:
+            self.notify(REMOVE, key, None)
@@ -0,0 +1,148 @@
+from contextlib import contextmanager
+
+from guiml.dirty import mark_dirty
+
+# set of (id(object), attribute) that are read while tracking or None
+_reads = None
+
+# maps (id(object), attribute) to the owners that read it, by id of the owner
+_dependents = dict()
+
+# maps the id of an owner to the keys it read during its last tracking
+_sources = dict()
+
+
+class Reactive:
+    """
+    Mixin for components and injectables, which records reads of public
+    attributes while components are renewed. Writing to an attribute marks
+    all components dirty that read the attribute during their last renew, see
+    track.
+
+    Note that only assigning to an attribute is noticed, modifying the
+    assigned object (e.g. appending to a list) is not, unless it is one of
+    guiml.observables.
+    """
+
+    def __getattribute__(self, name):
+        if _reads is not None and name[0] != "_":
+            _reads.add((id(self), name))
+
+        return super().__getattribute__(name)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        changed(self, name)
+
+
+def read(obj, name):
+    """
+    Record that the value called name of obj is read, if reads are recorded.
+    """
+
+    if _reads is not None:
+        _reads.add((id(obj), name))
+
+
+def changed(obj, name):
+    """
+    Mark all owners dirty that read the value called name of obj during their
+    last tracking.
+    """
+
+    dependents = _dependents.get((id(obj), name))
+    if dependents:
+        for owner in list(dependents.values()):
+            mark_dirty(owner)
+
+
+def forget(owner):
+    """
+    Remove all dependencies recorded for owner.
+    """
+
+    for key in _sources.pop(id(owner), ()):
+        dependents = _dependents.get(key)
+        if dependents is not None:
+            dependents.pop(id(owner), None)
+            if not dependents:
+                del _dependents[key]
+
+
+class Recording:
+
+    def __init__(self, outer):
+        # The component the reads are recorded for. If it is not set, the
+        # reads are passed on to the enclosing recording.
+        self.owner = None
+        self.reads = set()
+        # the reads of the enclosing recording or None
+        self.outer = outer
+
+
+def start():
+    """
+    Start recording the attributes of reactive objects that are read, until
+    stop is called with the returned recording. Recordings must be stopped
+    in the reverse order they are started.
+    """
+
+    global _reads
+    recording = Recording(_reads)
+    _reads = recording.reads
+    return recording
+
+
+def stop(recording, replace=True):
+    """
+    Stop the recording. The reads become the dependencies of the owner of the
+    recording and replace the ones recorded previously for the owner, or are
+    added to them if replace is not set.
+    """
+
+    global _reads
+    _reads = recording.outer
+
+    owner = recording.owner
+    if owner is not None:
+        sources = _sources.get(id(owner))
+        if replace or sources is None:
+            forget(owner)
+            _sources[id(owner)] = recording.reads
+        else:
+            sources.update(recording.reads)
+
+        for key in recording.reads:
+            _dependents.setdefault(key, dict())[id(owner)] = owner
+    elif recording.outer is not None:
+        recording.outer.update(recording.reads)
+
+
+def pause():
+    """
+    Stop recording reads until resume is called with the returned value.
+    """
+
+    global _reads
+    reads = _reads
+    _reads = None
+    return reads
+
+
+def resume(reads):
+    global _reads
+    _reads = reads
+
+
+@contextmanager
+def track():
+    """
+    Record the attributes of reactive objects that are read inside the
+    context, see start and stop.
+    """
+
+    recording = start()
+    try:
+        yield recording
+    finally:
+        stop(recording)
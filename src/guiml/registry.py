@@ -5,6 +5,13 @@ from typing import Type, Optional
 _components = {}
 _layouts = {}
 _injectables = defaultdict(list)
+# injectables that are only created when they are first requested
+_lazy_injectables = set()
+# maps injectables to the scope they are shared in, if they are not created
+# for each node
+_injectable_scopes = dict()
+
+SCOPES = ("node", "window", "application", "process")
 
 
 @dataclass
@@ -13,6 +20,9 @@ class ComponentMetaProperties:
     name: str
     template: Optional['DataHandle'] = None  # noqa: F821
     style: Optional['DataHandle'] = None  # noqa: F821
+    # the number of removed instances kept for reuse by each parent, see
+    # Component.on_recycle
+    recycle: int = 0
 
 
 def component(*args, **kwargs):
@@ -58,14 +68,23 @@ def layout(name):
     return register
 
 
-def injectable(providers):
+def injectable(providers, lazy=False, scope="node"):
     if isinstance(providers, str):
         providers = [providers]
 
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown scope '{scope}', use one of {SCOPES}.")
+
     def register(cls):
         for provider in providers:
             _injectables[provider].append(cls)
 
+        if lazy:
+            _lazy_injectables.add(cls)
+
+        if scope != "node":
+            _injectable_scopes[cls] = scope
+
         return cls
 
     return register
@@ -30,6 +30,9 @@ class LazyFileLoader:
 
         return self.changed
 
+    def is_modified(self):
+        return os.stat(self.filename).st_mtime != self.read_time
+
     def load(self):
         with open(self.filename, "r") as f:
             self.data = f.read()
@@ -37,6 +40,93 @@ class LazyFileLoader:
         return self.data
 
 
+class Selector:
+    """
+    A style selector parsed once when the style is loaded. A selector
+    consists of a tag, an id (prefixed with $) or a class (prefixed with .)
+    followed by further classes, e.g., 'div.done.active'.
+    """
+
+    def __init__(self, key, order):
+        self.key = key
+        # position in the style file, to keep the order of equal selectors
+        self.order = order
+
+        parts = key.split(" ")
+        # Selectors for descendants are not supported and never match.
+        self.supported = len(parts) == 1
+
+        items = parts[-1].split(".")
+        # selectors with more classes take precedence
+        self.score = -len(items)
+
+        if items[0] == "":
+            self.name = "." + items[1]
+            classes = items[2:]
+        else:
+            self.name = items[0]
+            classes = items[1:]
+
+        if self.name[0] == ".":
+            classes.append(self.name[1:])
+
+        self.classes = frozenset(classes)
+
+    def matches(self, classes):
+        return self.supported and self.classes <= classes
+
+
+class SelectorIndex:
+    """
+    The rules of a style indexed by the id, tag or first class of their
+    selector, so that only rules that can apply to a node are tested.
+    """
+
+    ID = 0
+    TAG = 1
+    CLASS = 2
+
+    def __init__(self, rules=()):
+        self.by_id = dict()
+        self.by_tag = dict()
+        self.by_class = dict()
+
+        for order, (key, value) in enumerate(rules):
+            selector = Selector(key, order)
+            if selector.name[0] == "$":
+                index = self.by_id
+                name = selector.name[1:]
+            elif selector.name[0] == ".":
+                index = self.by_class
+                name = selector.name[1:]
+            else:
+                index = self.by_tag
+                name = selector.name
+
+            index.setdefault(name, list()).append((selector, value))
+
+    def __len__(self):
+        return sum(
+            len(rules) for index in (self.by_id, self.by_tag, self.by_class)
+            for rules in index.values())
+
+    def candidates(self, node_id, tag, classes):
+        """
+        Yield (kind, selector, data) for all rules that might match.
+        """
+
+        if node_id is not None:
+            for selector, data in self.by_id.get(node_id, ()):
+                yield self.ID, selector, data
+
+        for selector, data in self.by_tag.get(tag, ()):
+            yield self.TAG, selector, data
+
+        for style_class in classes & self.by_class.keys():
+            for selector, data in self.by_class[style_class]:
+                yield self.CLASS, selector, data
+
+
 class StyleLoader(LazyFileLoader):
 
     def load(self):
@@ -52,19 +142,7 @@ class StyleLoader(LazyFileLoader):
                 self.data[key] = self.reorganize(value)
 
     def reorganize(self, data):
-        result = dict()
-        for key, value in data.items():
-            last = key.split(' ')[-1]
-            elements = last.split('.')
-            if elements[0] == '':
-                first = '.' + elements[1]
-            else:
-                first = elements[0]
-
-            values = result.setdefault(first, list())
-            values.append((key, value))
-
-        return result
+        return SelectorIndex(data.items())
 
 
 class XmlLoader(LazyFileLoader):
@@ -89,8 +167,15 @@ class FileCache:
         return self.files[file_path]
 
     def reload(self):
+        changed = False
         for loader in self.files.values():
-            loader.reload()
+            if loader.reload():
+                changed = True
+
+        return changed
+
+    def is_modified(self):
+        return any(loader.is_modified() for loader in self.files.values())
 
 
 ResourceData = namedtuple("ResourceData", "data changed")
@@ -144,36 +229,66 @@ class TemplateHandle:
         self.loader = loader
         self.index = index
         self.read_time = None
+        self.data = None
 
     def get(self):
-        data = self.loader.data
-        if self.index:
-            data = data.find(self.index)
-
-            if data is None:
-                logging.warning(f"Did not find template for '{self.index}'.")
-
         changed = False
         if self.read_time != self.loader.read_time:
             self.read_time = self.loader.read_time
             changed = True
 
-        return ResourceData(data, changed)
+            # Only search for the template once per version of the file.
+            data = self.loader.data
+            if self.index:
+                data = data.find(self.index)
+
+                if data is None:
+                    logging.warning(
+                        f"Did not find template for '{self.index}'.")
+
+            self.data = data
+
+        return ResourceData(self.data, changed)
 
 
 _resource_manger = []
 
 
 def reload_resources():
+    """
+    Reload all changed resource files.
+
+    Returns:
+        bool: if any file changed
+    """
+
     global _resource_manger
     tmp = _resource_manger
     _resource_manger = []
 
+    changed = False
     for ref in tmp:
         manager = ref()
         if manager is not None:
             _resource_manger.append(ref)
-            manager.reload()
+            if manager.reload():
+                changed = True
+
+    return changed
+
+
+def resources_modified():
+    """
+    Check if any resource file changed since it was loaded, without
+    reloading it.
+    """
+
+    for ref in _resource_manger:
+        manager = ref()
+        if manager is not None and manager.is_modified():
+            return True
+
+    return False
 
 
 class ResourceManager:
@@ -202,4 +317,7 @@ class ResourceManager:
         return TemplateHandle(loader)
 
     def reload(self):
-        self.cache.reload()
+        return self.cache.reload()
+
+    def is_modified(self):
+        return self.cache.is_modified()
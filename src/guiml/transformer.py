@@ -1,8 +1,21 @@
+import ast
 import copy
+import functools
 import xml.etree.ElementTree as ET
 
+from collections import OrderedDict
+
 from guiml.registry import _components
 from guiml.injectables import timeit
+from guiml.dirty import mark_dirty
+from guiml.observables import (
+    ObservableList,
+    WeakCallback,
+    INSERT,
+    REMOVE,
+    MOVE,
+    UPDATE,
+)
 
 
 def del_atribute(node, attribute):
@@ -43,16 +56,33 @@ class DynamicDOM:
             manipulator(node, component)
 
 
+def split_text(text):
+    """
+    Split text into the words that are placed into separate text nodes.
+    """
+
+    if text:
+        text = text.strip()
+
+    if text:
+        return text.split(" ")
+    else:
+        return []
+
+
+def has_template(tag):
+    meta_data = _components.get(tag)
+    return meta_data is not None and meta_data.template is not None
+
+
 class TextTransformer:
 
     def addText(self, element, text, position):
-        if text:
-            text = text.strip()
+        texts = split_text(text)
 
-        if text:
+        if texts:
             self.modified = True
 
-            texts = text.split(" ")
             for i, text in enumerate(texts):
                 txt = ET.Element('text')
                 txt.text = text + " "
@@ -75,25 +105,64 @@ class TextTransformer:
 
 class TemplatesTransformer:
     ATTR_TEMPLATE_MARKER = "_template_expanded"
+    ATTR_TEMPLATE = "_template"
     ATTR_CREATOR_STYLE = "_creator_style"
 
+    def __init__(self):
+        # maps component names to the template the prototype was made from
+        # and the prototype
+        self.prototypes = dict()
+
     @classmethod
     def get_creator_style(cls, node):
         return node.get(cls.ATTR_CREATOR_STYLE, None)
 
-    def insert_template(self, node, template, style):
-        # todo add proper error message
-        assert (template.tag == node.tag)
+    @classmethod
+    def get_template(cls, node):
+        """
+        The template to expand into the children of node.
+        """
+        return node.get(cls.ATTR_TEMPLATE, None)
 
-        attrib = node.attrib
-        node.clear()
-        node.attrib = attrib
-        node.set(self.ATTR_TEMPLATE_MARKER, True)
-        node.extend(copy.deepcopy(template))
+    def make_prototype(self, template, style):
+        prototype = copy.deepcopy(template)
 
         if style is not None:
-            for decendent in node.iter():
-                decendent.set(self.ATTR_CREATOR_STYLE, style)
+            # The root of the prototype keeps the style of its creator.
+            for child in prototype:
+                for decendent in child.iter():
+                    decendent.set(self.ATTR_CREATOR_STYLE, style)
+
+        return prototype
+
+    def get_prototype(self, meta_data):
+        """
+        The template of the component with the style of the component
+        attached. The prototype is shared by all instances of the component
+        and is only rebuild when the template changes.
+        """
+
+        template, changed = meta_data.template.get()
+        if template is None:
+            return None
+
+        cached = self.prototypes.get(meta_data.name)
+        if changed or cached is None or cached[0] is not template:
+            prototype = self.make_prototype(template, meta_data.style)
+            cached = (template, prototype)
+            self.prototypes[meta_data.name] = cached
+
+        return cached[1]
+
+    def insert_template(self, node, prototype):
+        # todo add proper error message
+        assert (prototype.tag == node.tag)
+
+        # The template is only attached to the node, the ControlTransformer
+        # will expand it into the already existing children. The prototype
+        # must not be modified.
+        node.set(self.ATTR_TEMPLATE_MARKER, True)
+        node.set(self.ATTR_TEMPLATE, prototype)
 
     def is_expanded(self, node):
         return node.get(self.ATTR_TEMPLATE_MARKER, False)
@@ -103,57 +172,220 @@ class TemplatesTransformer:
 
         if meta_data:
             if meta_data.template is not None:
-                data, changed = meta_data.template.get()
+                prototype = self.get_prototype(meta_data)
 
-                if data is not None:
-                    self.insert_template(node, data, meta_data.style)
+                if prototype is not None:
+                    self.insert_template(node, prototype)
                     return True
 
         return False
 
 
-for_loop = """
-__result__ = list()
-%(for_loop)s:
-    __locals__ = dict(locals())
-    del __locals__["__result__"]
-    __locals__.pop("__locals__", None)
-    __result__.append(__locals__)
+class ExpressionCache:
+    """
+    Cache for compiled template expressions, such that the python source of
+    an expression is only parsed once. The least recently used expressions
+    are dropped if the cache grows beyond max_size.
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.code = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, source, mode="eval"):
+        return self.get((source, mode),
+                        lambda: compile(source, "<template>", mode))
+
+    def compile_for(self, control):
+        """
+        The code of the iterable and the loop function of a for control, see
+        compile_for.
+        """
+
+        return self.get((control, "for"), lambda: compile_for(control))
+
+    def get(self, key, create):
+        try:
+            code = self.code[key]
+        except KeyError:
+            self.misses += 1
+            code = create()
+            self.code[key] = code
+            if len(self.code) > self.max_size:
+                self.code.popitem(last=False)
+        else:
+            self.hits += 1
+            self.code.move_to_end(key)
+
+        return code
+
+    def stats(self):
+        return {
+            "size": len(self.code),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+expression_cache = ExpressionCache()
+
+
+class LoopScope(dict):
+    """
+    The loop variables of one iteration of a for control. All other names are
+    looked up in the context of the loop, which is shared by all iterations
+    instead of being copied.
+    """
+
+    # The parent is assigned after creating the scope, initializing the
+    # variables through the constructor of dict is faster.
+    __slots__ = ("parent", )
+
+    def __missing__(self, key):
+        return self.parent[key]
+
+
+def loop_variables(target):
+    return sorted({
+        node.id
+        for node in ast.walk(target)
+        if isinstance(node, ast.Name)
+    })
+
+
+loop_function = """
+def loop(_guiml_iterable, _guiml_context):
+    for %(target)s in _guiml_iterable:
+        _guiml_child = _guiml_scope(%(variables)s)
+        _guiml_child.parent = _guiml_context
+        yield _guiml_child
 """
 
 
+def compile_for(control):
+    """
+    Compile a for control into the code of its iterable and a generator
+    function, which takes the value of the iterable and the context of the
+    loop and yields a LoopScope for each iteration.
+    """
+
+    loop = ast.parse(f"{control}: pass").body[0]
+    if not isinstance(loop, ast.For):
+        raise SyntaxError(f"Invalid for control: '{control}'")
+
+    variables = ", ".join(
+        f"{name}={name}" for name in loop_variables(loop.target))
+    namespace = {"_guiml_scope": LoopScope}
+    exec(compile(loop_function % {
+        "target": ast.unparse(loop.target),
+        "variables": variables
+    }, "<template>", "exec"), namespace)
+
+    return (compile(ast.Expression(loop.iter), "<template>", "eval"),
+            namespace["loop"])
+
+
+class ForExpansion:
+    """
+    The children a for control over an ObservableList was expanded into.
+    Changes of the list are collected and only the changed items are
+    expanded again, see ControlTransformer.patch.
+    """
+
+    def __init__(self, child, loop, context, items, target, start, width,
+                 count):
+        # the node with the for control and the loop function of the control
+        self.child = child
+        self.loop = loop
+        # the context of the for control
+        self.context = context
+        self.items = items
+        self.target = target
+        # position of the first child in target, the number of nodes each
+        # item is expanded into and the number of items
+        self.start = start
+        self.width = width
+        self.count = count
+
+        self.changes = list()
+        self.subscription = WeakCallback(self.on_change).subscribe(
+            items.on_change)
+
+    def on_change(self, change):
+        self.changes.append(change)
+        mark_dirty(self)
+
+    def close(self):
+        self.subscription.cancel()
+        self.changes.clear()
+
+
 class ControlTransformer:
     CONTROL_ATTRIBUTE = "control"
+    # the ForExpansions of the children of a node
+    EXPANSIONS_ATTRIBUTE = "_for_expansions"
 
     CONTEXT_ATTRIBUTE = "_context"
     CLEAR_CONTEXT_ATTRIBUTE = "_clear_context"
 
-    def __init__(self):
+    def __init__(self, expressions=expression_cache, compiler=None):
+        self.expressions = expressions
+        # If a TemplateCompiler is given, templates are expanded by compiled
+        # render functions instead of interpreting them.
+        self.compiler = compiler
+
         def getter(value, context):
+            code = self.expressions.compile(value)
+
             def _getter(self):
-                return eval(value, None, context)
+                return eval(code, None, context)
 
             return _getter
 
         self.getter = getter
 
         def setter(value, context):
+            code = self.expressions.compile(f"{value} = _guiml_bind_value",
+                                            "exec")
 
             def _setter(self, x):
                 context["_guiml_bind_value"] = x
-                exec(f"{value} = _guiml_bind_value", None, context)
+                exec(code, None, context)
+                mark_dirty(context["self"])
 
             return _setter
 
         self.setter = setter
 
+        def handler(callback, owner):
+            # Calling an event handler usually changes the state of the
+            # component that provided the handler.
+            @functools.wraps(callback)
+            def _handler(*args, **kwargs):
+                try:
+                    return callback(*args, **kwargs)
+                finally:
+                    mark_dirty(owner)
+
+            return _handler
+
+        self.handler = handler
+
+    def event(self, value, owner):
+        if callable(value):
+            return self.handler(value, owner)
+        else:
+            return value
+
     def eval_if(self, control, context):
-        return eval("bool(%s)" % (control[2:]), None, context)
+        code = self.expressions.compile("bool(%s)" % (control[2:]))
+        return eval(code, None, context)
 
     def eval_for(self, control, context):
-        local = {**context}
-        exec(for_loop % {"for_loop": control}, None, local)
-        return local["__result__"]
+        iterable, loop = self.expressions.compile_for(control)
+        return loop(eval(iterable, None, context), context)
 
     # @timeit('renew > on_data_renewed > ')
     def transform_attributes(self, node, context):
@@ -165,10 +397,13 @@ class ControlTransformer:
                 if isinstance(value, str):
                     modified = True
                     del_atribute(node, key)
-                    new_value = eval(value, None, context)
+                    new_value = eval(self.expressions.compile(value), None,
+                                     context)
 
                     if key.startswith("py_"):
                         key = key[3:]
+                    else:
+                        new_value = self.event(new_value, context["self"])
                     node.set(key, new_value)
             elif key.startswith("bind_"):
                 value = node.get(key)
@@ -183,11 +418,11 @@ class ControlTransformer:
 
                     node.set(key, new_value)
             elif key.startswith("class_"):
-                value = f"bool({node.get(key)})"
+                code = self.expressions.compile(f"bool({node.get(key)})")
                 del_atribute(node, key)
 
-                def condition(value=value, context=context):
-                    result = eval(value, None, context)
+                def condition(code=code, context=context):
+                    result = eval(code, None, context)
                     return result
 
                 # todo: the transformation should only be called once on the
@@ -197,47 +432,228 @@ class ControlTransformer:
 
         return modified
 
-    def transform(self, node, context, component_root=False):
-        new_node = ET.Element(node.tag, attrib=copy.copy(node.attrib))
-        new_node.text = node.text
-        new_node.tail = node.tail
+    def place(self, target, position, tag):
+        """
+        Get the child of target at position to expand a node with the given
+        tag into. The existing child is reused if it has the same tag.
+        """
 
-        if not component_root:
-            self.transform_attributes(new_node, context)
+        if position < len(target):
+            child = target[position]
+            if child.tag == tag:
+                return child
 
-        for child in node:
-            control = child.get(self.CONTROL_ATTRIBUTE)
-            if not control:
-                new_node.append(self.transform(child, context))
-            else:
-                control = control.strip()
-                del_atribute(child, self.CONTROL_ATTRIBUTE)
+            child = ET.Element(tag)
+            target[position] = child
+        else:
+            child = ET.Element(tag)
+            target.append(child)
 
-                if control[:2] == "if":
-                    display = self.eval_if(control, context)
-                    if display:
-                        new_node.append(self.transform(child, context))
+        return child
 
-                elif control[:3] == "for":
-                    items = self.eval_for(control, context)
+    def place_text(self, target, position, text):
+        return self.place_words(target, position, split_text(text))
 
-                    for j, sibling_context in enumerate(items):
-                        new_node.append(self.transform(child, sibling_context))
+    def place_words(self, target, position, words):
+        for word in words:
+            child = self.place(target, position, "text")
+            child.attrib = dict()
+            child.text = word + " "
+            child.tail = None
+            del child[:]
+            position += 1
 
-        return new_node
+        return position
 
-    def __call__(self, node, component):
-        meta_data = _components.get(node.tag)
+    def make_words(self, text):
+        words = list()
+        for word in split_text(text):
+            child = ET.Element("text")
+            child.text = word + " "
+            words.append(child)
+
+        return words
 
-        if not meta_data or meta_data.template is None:
+    def eval_control(self, control, context):
+        """
+        Returns:
+            the contexts to expand a child with the control with, and the
+            ObservableList and loop function if the child is repeated for the
+            items of an ObservableList
+        """
+
+        if not control:
+            return (context, ), None, None
+
+        control = control.strip()
+        if control[:2] == "if":
+            if self.eval_if(control, context):
+                return (context, ), None, None
+
+        elif control[:3] == "for":
+            iterable, loop = self.expressions.compile_for(control)
+            items = eval(iterable, None, context)
+            if isinstance(items, ObservableList):
+                # Iterating does not count as reading the list, changes are
+                # patched instead of renewing the component.
+                return loop(list.__iter__(items), context), items, loop
+
+            return loop(items, context), None, None
+
+        return (), None, None
+
+    def transform(self, node, context, target, component_root=False):
+        """
+        Expand node into target. Target is modified in place and its children
+        are reused where possible. All children of a node are placed before
+        they are expanded, using an explicit stack instead of recursion.
+        """
+
+        self.expand([(node, context, target, component_root)])
+
+    def expand(self, stack):
+        """
+        Expand the (node, context, target, component_root) entries of the
+        stack, see transform.
+        """
+
+        while stack:
+            node, context, target, component_root = stack.pop()
+
+            old_expansions = target.get(self.EXPANSIONS_ATTRIBUTE)
+            if old_expansions:
+                for expansion in old_expansions:
+                    expansion.close()
+                del target.attrib[self.EXPANSIONS_ATTRIBUTE]
+
+            if not component_root:
+                attrib = dict(node.attrib)
+                attrib.pop(self.CONTROL_ATTRIBUTE, None)
+                target.attrib = attrib
+                target.tail = None
+                self.transform_attributes(target, context)
+
+                if has_template(node.tag):
+                    # The children are expanded from the template, when the
+                    # component is renewed.
+                    continue
+
+            position = 0
+            if node.tag == "text":
+                target.text = node.text
+            else:
+                target.text = None
+                position = self.place_text(target, position, node.text)
+
+            expanded = list()
+            expansions = None
+            for child in node:
+                contexts, items, loop = self.eval_control(
+                    child.get(self.CONTROL_ATTRIBUTE), context)
+
+                start = position
+                for child_context in contexts:
+                    expanded.append(
+                        (child, child_context,
+                         self.place(target, position, child.tag), False))
+                    position = self.place_text(target, position + 1,
+                                               child.tail)
+
+                if items is not None:
+                    width = 1 + len(split_text(child.tail))
+                    count = (position - start) // width
+                    if expansions is None:
+                        expansions = list()
+                    expansions.append(
+                        ForExpansion(child, loop, context, items, target,
+                                     start, width, count))
+
+            del target[position:]
+            if expansions is not None:
+                target.set(self.EXPANSIONS_ATTRIBUTE, expansions)
+            stack.extend(reversed(expanded))
+
+    def patch(self, expansion):
+        """
+        Apply the changes of the ObservableList to the children of the
+        expansion. Only inserted and updated items are expanded.
+
+        Returns:
+            list: the children of the target that were expanded, or None if
+                the target was expanded again since the expansion was made
+        """
+
+        target = expansion.target
+        expansions = target.get(self.EXPANSIONS_ATTRIBUTE, ())
+        for number, other in enumerate(expansions):
+            if other is expansion:
+                break
+        else:
+            return None
+
+        changes = expansion.changes
+        expansion.changes = list()
+
+        child = expansion.child
+        width = expansion.width
+        old_count = expansion.count
+        expanded = list()
+
+        for kind, index, value in changes:
+            position = expansion.start + index * width
+            if kind == INSERT:
+                children = list()
+                for context in expansion.loop(iter(value), expansion.context):
+                    element = ET.Element(child.tag)
+                    children.append(element)
+                    children.extend(self.make_words(child.tail))
+                    expanded.append((child, context, element, False))
+
+                target[position:position] = children
+                expansion.count += len(value)
+
+            elif kind == REMOVE:
+                del target[position:position + value * width]
+                expansion.count -= value
+
+            elif kind == MOVE:
+                children = target[position:position + width]
+                del target[position:position + width]
+                position = expansion.start + value * width
+                target[position:position] = children
+
+            elif kind == UPDATE:
+                context = next(expansion.loop(iter((value, )),
+                                              expansion.context))
+                expanded.append((child, context, target[position], False))
+
+        # The children of later for controls moved.
+        shift = (expansion.count - old_count) * width
+        for other in expansions[number + 1:]:
+            other.start += shift
+
+        # An element changed several times is expanded with its last context.
+        latest = dict()
+        for entry in expanded:
+            latest[id(entry[2])] = entry
+        expanded = list(latest.values())
+
+        self.expand(list(reversed(expanded)))
+        return [entry[2] for entry in expanded]
+
+    def __call__(self, node, component):
+        template = TemplatesTransformer.get_template(node)
+        if template is None:
             return
 
-        new_node = self.transform(node, {"self": component}, component_root=True)
+        if self.compiler is not None:
+            render = self.compiler.get(_components[node.tag], template)
+            if render is not None:
+                render(component, node, self)
+                return
 
-        # copy childs from new node, but otherwise keep original node
-        for i in reversed(range(len(node))):
-            del node[i]
-        node.extend(new_node)
+        self.transform(template, {"self": component}, node,
+                       component_root=True)
 
     # @classmethod
     # def iter_context(cls, node):
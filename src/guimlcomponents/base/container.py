@@ -71,6 +71,14 @@ class DrawableComponent(Component, Subscriber):
         self.cancel_subscriptions()
         super().on_destroy()
 
+    def on_hide(self):
+        self.cancel_subscriptions()
+        super().on_hide()
+
+    def on_show(self):
+        super().on_show()
+        self.resume_subscriptions()
+
 
 class InteractiveComponent(DrawableComponent):
     STYLE_CLASS_HOVER = 'hover'
@@ -127,6 +135,11 @@ class InteractiveComponent(DrawableComponent):
         mouse_control.focus_exit(self)
         super().on_destroy()
 
+    def on_hide(self):
+        if self._hover:
+            self.on_mouse_exit()
+        super().on_hide()
+
     def on_mouse_enter(self):
         self._hover = True
         self.style_classes.add(self.STYLE_CLASS_HOVER)
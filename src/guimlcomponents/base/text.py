@@ -163,14 +163,22 @@ class Text(UIComponent):
             return text
 
     def get_layout(self):
-        layout = pango.Layout(self.dependencies.pango.context)
-
         text = self.get_display_text()
         if not self.properties.apply_markup:
             text = escape(text)
 
-        layout.apply_markup(text)
-        return layout
+        # The layout is only rebuild if the displayed text changed. The text
+        # is compared directly, as it might be bound or change due to a
+        # selection without the properties being updated.
+        context = self.dependencies.pango.context
+        key = (text, context)
+        if getattr(self, "_layout_key", None) != key:
+            layout = pango.Layout(context)
+            layout.apply_markup(text)
+            self._layout = layout
+            self._layout_key = key
+
+        return self._layout
 
     def index_from_position(self, x, y):
         index = pango.ffi.new("int *")
@@ -275,6 +283,10 @@ class RawInput(Text):
         self.release_text_focus()
         super().on_destroy()
 
+    def on_hide(self):
+        self.release_text_focus()
+        super().on_hide()
+
     def get_input_text(self):
         return escape(self.text)
 
@@ -154,6 +154,7 @@ class Window(Component):
             self.dependencies.canvas.on_draw.subscribe(self.on_draw)
 
         self.window.push_handlers(self.on_activate, self.on_deactivate)
+        self.register_frame_requests()
 
     @property
     def content_position(self):
@@ -208,6 +209,32 @@ class Window(Component):
 
         self.window.push_handlers(**args)
 
+    def register_frame_requests(self):
+        # When running frames on demand, any input might change the state of
+        # the application and the window needs to be redrawn if it is exposed
+        # or resized.
+        events = [
+            "on_mouse_motion",
+            "on_mouse_press",
+            "on_mouse_release",
+            "on_mouse_drag",
+            "on_mouse_enter",
+            "on_mouse_leave",
+            "on_mouse_scroll",
+            "on_key_press",
+            "on_key_release",
+            "on_text",
+            "on_text_motion",
+            "on_text_motion_select",
+            "on_resize",
+            "on_expose",
+        ]
+
+        def request_frame(*args, **kwargs):
+            self.dependencies.ui_loop.request_frame()
+
+        self.window.push_handlers(**{event: request_frame for event in events})
+
     # def on_destroy(self):
     #     self._ui_loop_on_update_subscription.cancel()
 
@@ -280,11 +307,18 @@ class Window(Component):
 
     # timeit('Window.')
     def on_update(self, dt):
-        self.clear()
-        self.dependencies.canvas.draw()
-
-        # Update texture from sruface data
-        gl.glBindTexture(gl.GL_TEXTURE_2D, self.texture.id)
-        gl.glTexImage2D(gl.GL_TEXTURE_2D, 0, gl.GL_RGBA, self.properties.width,
-                        self.properties.height, 0, gl.GL_BGRA,
-                        gl.GL_UNSIGNED_BYTE, self.surface_data)
+        # Keep the last complete frame until the components are updated.
+        if self.dependencies.ui_loop.frame_complete:
+            self.clear()
+            self.dependencies.canvas.draw()
+
+            # Update texture from sruface data
+            gl.glBindTexture(gl.GL_TEXTURE_2D, self.texture.id)
+            gl.glTexImage2D(gl.GL_TEXTURE_2D, 0, gl.GL_RGBA,
+                            self.properties.width, self.properties.height, 0,
+                            gl.GL_BGRA, gl.GL_UNSIGNED_BYTE,
+                            self.surface_data)
+
+        if self.dependencies.ui_loop.on_demand:
+            # pyglet does not redraw the window on its own in this case
+            self.window.draw(dt or 0.)
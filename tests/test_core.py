@@ -1,11 +1,21 @@
+import copy
 import pytest
 
 from dataclasses import dataclass, field
 
 from guiml.core import *
+from guiml.dirty import mark_dirty
+from guiml.components import Component, Reactive
+from guiml.registry import _components, component, ComponentMetaProperties
+from guiml.resources import RawHandle
+from guiml.observables import ObservableList
+from guimlcomponents.base.shared import Rectangle
+from guimlcomponents.base.layout import StackLayout
 
 from typing import Optional
 
+import xml.etree.ElementTree as ET
+
 
 @pytest.mark.parametrize("a,b,result", [(None, 1, 1),
                                         ({
@@ -41,8 +51,23 @@ class DummyDataClass2:
     val: Optional[DummyDataClass]
 
 
+@dataclass
+class DummyDataClass3:
+    mode: typing.Literal["a", "b"] = "a"
+    val: typing.Union[int, str] = 0
+    items: list[int] = field(default_factory=list)
+
+
 @pytest.mark.parametrize("data,data_type,expected", [
     ({}, DummyDataClass, DummyDataClass()),
+    ({
+        "val1": "3"
+    }, DummyDataClass, DummyDataClass(val1=3)),
+    ({
+        "mode": "b",
+        "val": "x",
+        "items": [1],
+    }, DummyDataClass3, DummyDataClass3(mode="b", val="x")),
     ({
         "val1": 2
     }, DummyDataClass, DummyDataClass(val1=2)),
@@ -55,3 +80,593 @@ class DummyDataClass2:
 ])
 def test_structure(data, data_type, expected):
     assert (structure(data, data_type) == expected)
+    assert (structure_plan(data_type) is structure_plan(data_type))
+
+
+class RecordingManager(PersistationManager):
+
+    def __init__(self):
+        super().__init__()
+        self.renewed = list()
+
+    def create_data(self, node, parent_nodes):
+        return node.tag
+
+    def on_data_renewed(self, data, node, parent_nodes):
+        self.renewed.append(data)
+
+
+def test_renew_data_nodes():
+    manager = RecordingManager()
+    manager.renew(ET.fromstring("<a><b><c></c></b><d></d></a>"))
+    assert (manager.renewed == ["a", "b", "c", "d"])
+
+    data_node_b = next(iter(manager.root))
+    manager.renewed.clear()
+    manager.renew_data_nodes([data_node_b])
+    assert (manager.renewed == ["b", "c"])
+    assert (data_node_b.parent is manager.root)
+
+
+def test_iter_renew():
+    manager = RecordingManager()
+    manager.renew(ET.fromstring("<a><b></b></a>"))
+
+    root = manager.root
+    manager.renewed.clear()
+    steps = manager.iter_renew(ET.fromstring("<a><b></b><c></c></a>"))
+    next(steps)
+    # renewing stops after the first node and the root is renewed in place
+    assert (manager.renewed == ["a"])
+    assert (manager.root is root)
+
+    run_steps(steps)
+    assert (manager.renewed == ["a", "b", "c"])
+    assert (manager.root is root)
+    assert (len(list(manager.root)) == 2)
+
+
+class FailingManager(ComponentManager):
+
+    def __init__(self, **kwargs):
+        self.failures = 0
+        self.renewed = 0
+        super().__init__(**kwargs)
+
+    def on_data_renewed(self, data, node, parent_nodes):
+        super().on_data_renewed(data, node, parent_nodes)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("renewing failed")
+        self.renewed += 1
+
+
+@pytest.mark.parametrize("time_budget", [None, 1.0])
+def test_update_after_failure(time_budget):
+    pop_dirty()
+    manager = FailingManager(incremental=True, time_budget=time_budget)
+    ui_loop = manager.root.data.injectables[UILoop]
+
+    manager.failures = 1
+    mark_dirty(ui_loop)
+    with pytest.raises(RuntimeError):
+        manager.on_update(0)
+    assert (manager.pending_update is None)
+
+    # the next frame renews again
+    renewed = manager.renewed
+    mark_dirty(ui_loop)
+    manager.on_update(0)
+    assert (manager.renewed == renewed + 1)
+
+    manager.destroy_root()
+
+
+class DestroyRecordingManager(RecordingManager):
+
+    def __init__(self):
+        super().__init__()
+        self.destroyed = list()
+
+    def destroy_data(self, data):
+        self.destroyed.append(data)
+
+
+class ParkRecordingManager(DestroyRecordingManager):
+
+    def __init__(self):
+        super().__init__()
+        self.parked = list()
+
+    def on_data_parked(self, data):
+        self.parked.append(data)
+
+
+def test_keep_alive():
+    manager = ParkRecordingManager()
+    manager.max_kept_alive = 1
+    shown = ET.fromstring('<a><b keep_alive="1"><c></c></b>'
+                          '<d keep_alive="1"></d></a>')
+    manager.renew(shown)
+
+    manager.renew(ET.fromstring("<a></a>"))
+    # only the subtree parked last is kept
+    assert (manager.parked == ["b", "c", "d"])
+    assert (manager.destroyed == ["c", "b"])
+
+    manager.renewed.clear()
+    manager.renew(shown)
+    assert (manager.renewed == ["a", "b", "c", "d"])
+    assert (not manager.kept_alive)
+
+    manager.renew(ET.fromstring("<a></a>"))
+    manager.destroy_root()
+    assert (manager.destroyed == ["c", "b", "c", "b", "d", "a"])
+
+
+class UniqueData(str):
+    pass
+
+
+class RecycleRecordingManager(ParkRecordingManager):
+
+    def __init__(self):
+        super().__init__()
+        self.recycled = list()
+        self.unparked = list()
+
+    def create_data(self, node, parent_nodes):
+        # data of different nodes must not be identical
+        return UniqueData(node.tag)
+
+    def recycle_limit(self, data, node):
+        return 1
+
+    def on_data_unparked(self, data):
+        self.unparked.append(data)
+
+    def on_data_recycled(self, data, node, parent_nodes):
+        self.recycled.append(data)
+
+
+def test_recycle():
+    def tree(*keys):
+        root = ET.Element("a")
+        for key in keys:
+            ET.SubElement(root, "b", persistation_strategy="key",
+                          persistance_key=key)
+        return root
+
+    manager = RecycleRecordingManager()
+    manager.renew(tree("1", "2"))
+
+    # the data of removed children is reused for new children
+    manager.renew(tree("2", "3"))
+    assert (manager.recycled == ["b"])
+    assert (manager.destroyed == [])
+
+    manager.renew(tree())
+    assert (manager.parked == ["b", "b"])
+    assert (manager.destroyed == ["b"])
+
+    # pooled data is only shown again once its node is renewed
+    pooled, = manager.root.recycled["b"]
+    steps = manager.iter_renew(tree("4"))
+    next(steps)
+    assert (manager.unparked == [])
+    assert (pooled.hidden and pooled.recycling)
+
+    run_steps(steps)
+    assert (manager.unparked == ["b"])
+    assert (manager.recycled == ["b", "b"])
+    assert (not pooled.hidden and not pooled.recycling)
+
+    manager.destroy_root()
+    assert (manager.destroyed == ["b", "b", "a"])
+
+
+def deep_tree(depth):
+    root = ET.Element("n0")
+    node = root
+    for i in range(1, depth):
+        node = ET.SubElement(node, f"n{i}")
+
+    return root
+
+
+def test_deep_tree():
+    depth = 5000
+    manager = DestroyRecordingManager()
+    root = deep_tree(depth)
+    manager.renew(root)
+    assert (len(manager.renewed) == depth)
+
+    data_node = manager.root
+    while list(data_node):
+        data_node = next(iter(data_node))
+    assert (data_node.data == f"n{depth - 1}")
+
+    manager.renewed.clear()
+    manager.renew_data_nodes([data_node])
+    assert (manager.renewed == [f"n{depth - 1}"])
+
+    manager.destroy_root()
+    assert (manager.destroyed == [f"n{i}" for i in reversed(range(depth))])
+
+
+def test_key_persistation():
+    def children(*keys):
+        return [ET.Element("item", persistance_key=key) for key in keys]
+
+    strategy = KeyPersistation()
+    strategy.save(children("a", "b", "b"), [1, 2, 3])
+    assert (list(strategy.load(children("c", "b", "a", "b"))) ==
+            [None, 2, 1, 3])
+    assert (list(strategy.load([ET.Element("other", persistance_key="a")]))
+            == [None])
+
+
+def test_get_applicable_styles():
+    style = SelectorIndex([
+        ("div", {"a": 1}),
+        ("div.done", {"a": 2}),
+        (".done", {"a": 3}),
+        (".done.open", {"a": 4}),
+        ("$check", {"a": 5}),
+        ("text", {"a": 6}),
+    ])
+
+    def applicable(node_id, tag, classes):
+        return [data["a"] for data in
+                get_applicable_styles([style], node_id, tag, classes)]
+
+    selector_stats.reset()
+    assert (applicable(None, "div", set()) == [1])
+    assert (applicable(None, "div", {"done"}) == [3, 1, 2])
+    assert (applicable("check", "div", {"done", "open"}) == [3, 4, 1, 2, 5])
+    assert (applicable(None, "text", {"other"}) == [6])
+
+    stats = selector_stats.stats()
+    assert (stats["nodes"] == 4)
+    assert (stats["rules_tested"] == 2 + 4 + 5 + 1)
+    assert (stats["rules_matched"] == 1 + 3 + 5 + 1)
+
+
+def test_structure_bound_properties():
+    values = [1, 2]
+
+    def binding(i):
+        def setter(self, value):
+            values[i] = value
+
+        return property(lambda self: values[i], setter)
+
+    first = structure({"val1": binding(0), "val2": "a"}, DummyDataClass)
+    second = structure({"val1": binding(1)}, DummyDataClass)
+
+    assert (type(first) is type(second))
+    assert (values == [1, 2])
+    assert ((first.val1, first.val2, second.val1) == (1, "a", 2))
+
+    second.val1 = 5
+    assert (values == [1, 5])
+    assert (first.val1 == 1)
+
+
+def test_merge_layers():
+    layers = [{"a": [1], "b": {"x": 1, "y": 1}, "c": 1},
+              {"a": [2], "b": {"y": 2}},
+              {"b": {"z": 3}, "c": {"w": 1}}]
+
+    expected = layers[0]
+    for layer in layers[1:]:
+        expected = merge_data(expected, layer)
+
+    result = merge_layers(layers)
+    assert (result == expected)
+    assert (result == {"a": [2, 1], "b": {"x": 1, "y": 2, "z": 3},
+                       "c": {"w": 1}})
+    assert (layers[0] == {"a": [1], "b": {"x": 1, "y": 1}, "c": 1})
+    # values that are not merged are shared with the layers
+    assert (result["c"] is layers[2]["c"])
+
+
+@component("core_test_box")
+class LayoutBox(Component):
+
+    @dataclass
+    class Properties(Component.Properties):
+        position: Rectangle = field(default_factory=Rectangle)
+        layout: str = "stack"
+
+    @dataclass
+    class Dependencies(Component.Dependencies):
+        pass
+
+    @property
+    def wrap_size(self):
+        return Rectangle()
+
+    @property
+    def content_position(self):
+        return self.properties.position
+
+    @property
+    def width(self):
+        return self.properties.position.width
+
+    @property
+    def height(self):
+        return self.properties.position.height
+
+
+@component("core_test_list", template=RawHandle(ET.fromstring("""
+<core_test_list>
+  <core_test_box control="if self.show">
+    <core_test_row control="for item in self.items" py_text="item">
+    </core_test_row>
+  </core_test_box>
+</core_test_list>""")))
+class ListTest(Reactive, LayoutBox):
+
+    def on_init(self):
+        self.show = True
+        self.items = ObservableList()
+
+
+@component("core_test_row")
+class RowTest(Component):
+
+    @dataclass
+    class Properties(Component.Properties):
+        position: Rectangle = field(default_factory=Rectangle)
+        text: str = ""
+
+    @dataclass
+    class Dependencies(Component.Dependencies):
+        pass
+
+    def on_init(self):
+        # additional width, to change the size without renewing the parent
+        self.extra = 0
+
+    @property
+    def width(self):
+        return 10 * len(self.properties.text) + self.extra
+
+    @property
+    def height(self):
+        return 12
+
+
+def set_application(monkeypatch, template):
+    monkeypatch.setitem(
+        _components, "application",
+        ComponentMetaProperties(Component, "application",
+                                template=RawHandle(ET.fromstring(template))))
+
+
+def find_components(manager, component_cls):
+    return [
+        data.component for node in manager.tree.iter()
+        if (data := manager.node_data.get(node)) is not None
+        and type(data.component) is component_cls
+    ]
+
+
+def positions(manager):
+    return [(type(component).__name__, getattr(component.properties,
+                                               "text", None),
+             component.properties.position)
+            for component in find_components(manager, RowTest)
+            + find_components(manager, ListTest)]
+
+
+@pytest.mark.parametrize("reactive", [False, True])
+def test_patch_observable_list(monkeypatch, reactive):
+    set_application(monkeypatch,
+                    "<application><core_test_list/></application>")
+    pop_dirty()
+    manager = ComponentManager(incremental=True, reactive=reactive)
+    owner, = find_components(manager, ListTest)
+    items = owner.items
+
+    def check():
+        manager.on_update(0)
+        full = ComponentManager()
+        full_owner, = find_components(full, ListTest)
+        full_owner.items = list(items)
+        full.on_update(0)
+
+        rows = find_components(manager, RowTest)
+        assert ([row.properties.text for row in rows] == list(items))
+        assert (positions(manager) == positions(full))
+        full.destroy_root()
+        return {row.properties.text: row for row in rows}
+
+    items.extend(["a", "bb", "ccc"])
+    rows = check()
+
+    changes = [
+        lambda: items.insert(1, "xxxx"),
+        lambda: items.remove("a"),
+        lambda: items.move(0, 2),
+        lambda: items.__setitem__(1, "y"),
+    ]
+    for change in changes:
+        change()
+        new_rows = check()
+        # rows of items that were not inserted or replaced are kept
+        for text, row in new_rows.items():
+            if text in rows:
+                assert (row is rows[text])
+        rows = new_rows
+
+    # The for control is removed with its target, its expansion is closed
+    # when the list changes afterwards. Patching keeps the dependencies of
+    # the last renew of the owner.
+    owner.show = False
+    if not reactive:
+        owner.mark_dirty()
+    manager.on_update(0)
+    items.append("z")
+    manager.on_update(0)
+    assert (find_components(manager, RowTest) == [])
+    assert (items.on_change.callbacks == [])
+
+    manager.destroy_root()
+
+
+@component("core_test_recycled_row", recycle=2)
+class RecycledRowTest(RowTest):
+
+    def on_init(self):
+        super().on_init()
+        self.events = list()
+
+    def on_hide(self):
+        self.events.append("hide")
+        super().on_hide()
+
+    def on_show(self):
+        self.events.append("show")
+        super().on_show()
+
+    def on_recycle(self, properties):
+        self.events.append(("recycle", properties.text))
+        super().on_recycle(properties)
+
+
+@component("core_test_recycle_list", template=RawHandle(ET.fromstring("""
+<core_test_recycle_list>
+  <core_test_recycled_row control="for item in self.items" py_text="item"
+      persistation_strategy="key" py_persistance_key="item">
+  </core_test_recycled_row>
+</core_test_recycle_list>""")))
+class RecycleListTest(LayoutBox):
+
+    def on_init(self):
+        self.items = list()
+
+
+def test_recycle_components(monkeypatch):
+    set_application(monkeypatch,
+                    "<application><core_test_recycle_list/></application>")
+    pop_dirty()
+    manager = ComponentManager(incremental=True)
+    owner, = find_components(manager, RecycleListTest)
+
+    def update(*items):
+        owner.items = list(items)
+        owner.mark_dirty()
+        manager.on_update(0)
+        rows = find_components(manager, RecycledRowTest)
+        assert ([row.properties.text for row in rows] == list(items))
+        return rows
+
+    a, b = update("a", "b")
+
+    # the row of a removed item is reused for a new item in the same frame
+    assert (update("b", "c") == [b, a])
+    assert (a.events == [("recycle", "c")])
+
+    # removed rows are hidden until they are reused
+    update("b")
+    assert (a.events[1:] == ["hide"])
+    assert (update("b", "d") == [b, a])
+    assert (a.events[2:] == ["show", ("recycle", "d")])
+    assert (b.events == [])
+
+    manager.destroy_root()
+
+
+def full_layout(manager):
+    """
+    Measure and place all nodes again, as if they were all renewed.
+    """
+
+    for data in manager.node_data.values():
+        data.renewed = True
+        if data.initial_position is not None:
+            data.component.properties.position = \
+                copy.copy(data.initial_position)
+
+    manager.compute_recommended_size(manager.tree)
+    manager.layout(manager.tree)
+
+
+def test_incremental_layout(monkeypatch):
+    set_application(monkeypatch,
+                    "<application><core_test_list/></application>")
+    pop_dirty()
+    manager = ComponentManager(incremental=True)
+    owner, = find_components(manager, ListTest)
+    owner.items.extend(["a", "bb", "ccc"])
+    manager.on_update(0)
+
+    measured = list()
+    compute_recommended_size = StackLayout.compute_recommended_size
+
+    def count(layout, children):
+        measured.append(layout.component)
+        compute_recommended_size(layout, children)
+
+    monkeypatch.setattr(StackLayout, "compute_recommended_size", count)
+
+    for extra in [30, 0]:
+        row = find_components(manager, RowTest)[1]
+        row.extra = extra
+        row.mark_dirty()
+        manager.on_update(0)
+        assert (measured)
+        measured.clear()
+
+        incremental = copy.deepcopy(positions(manager))
+        full_layout(manager)
+        assert (positions(manager) == incremental)
+        measured.clear()
+
+    # nothing is measured if nothing changed, no node is left marked for
+    # layout
+    manager.on_update(0)
+    manager.compute_recommended_size(manager.tree)
+    manager.layout(manager.tree)
+    assert (measured == [])
+
+    manager.destroy_root()
+
+
+styled_test_style = RawHandle({".big": {"text": "big"}})
+
+
+@component("core_test_styled", style=styled_test_style)
+class StyledTest(RowTest):
+    pass
+
+
+def test_style_cache(monkeypatch):
+    manager = ComponentManager()
+
+    def resolve():
+        node = ET.Element("core_test_styled", {"class": "big"})
+        return manager.resolve_style(node, {"big"})
+
+    # nodes with the same tag, classes and styles share the resolved style
+    first = resolve()
+    assert (first == {"text": "big"})
+    assert (resolve() is first)
+
+    # replacing the data of a style handle merges the style again
+    monkeypatch.setattr(styled_test_style, "data",
+                        {".big": {"text": "bigger"}})
+    second = resolve()
+    assert (second == {"text": "bigger"})
+
+    # reloaded resources clear the cache
+    monkeypatch.setattr("guiml.core.reload_resources", lambda: True)
+    manager.on_update(0)
+    third = resolve()
+    assert (third == second)
+    assert (third is not second)
+
+    manager.destroy_root()
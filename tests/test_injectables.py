@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from guiml.injectables import *
+from guiml.dirty import pop_dirty
 
 
 @injectable(providers="application")
@@ -40,3 +41,104 @@ def test_injector_application():
     injector = Injector()
     injector.add_tag("application")
     assert (injector[Injectable3].value() == 7 * 5 * 3 * 3)
+
+
+def test_injector_providers_are_flattened():
+    parent = Injector()
+    parent.add_tag("application")
+    order = get_creation_order("application")
+    assert (order is get_creation_order("application"))
+    assert (order.index(Injectable1) < order.index(Injectable2)
+            < order.index(Injectable3))
+
+    # children that do not provide injectables share the providers
+    child = Injector(providers=parent.providers)
+    assert (child.add_tag("no_injectables") == {})
+    assert (child.providers is parent.providers)
+    assert (child[Injectable1] is parent[Injectable1])
+
+
+@injectable(providers="lazy_test", lazy=True)
+class LazyInjectable4(Injectable):
+
+    @dataclass
+    class Dependencies:
+        injectable1: Injectable1
+
+
+def test_lazy_injectable():
+    created = list()
+    parent = Injector(on_create=created.append)
+    parent.add_tag("application")
+    injectables = parent.add_tag("lazy_test")
+    assert (injectables == {})
+
+    child = Injector(providers=parent.providers)
+    instance = child[LazyInjectable4]
+    assert (instance.injectable1 is parent[Injectable1])
+    assert (parent[LazyInjectable4] is instance)
+    assert (injectables == {LazyInjectable4: instance})
+    assert (created[-1] is instance)
+
+
+@injectable(providers="scope_test", scope="window")
+class SharedInjectable5(Injectable):
+
+    @dataclass
+    class Dependencies:
+        pass
+
+    def on_init(self):
+        self.destroyed = False
+
+    def on_destroy(self):
+        self.destroyed = True
+
+
+def test_injectable_scope():
+    window = Injector()
+    window.add_tag("window")
+
+    rows = [Injector(providers=window.providers, scopes=window.scopes)
+            for i in range(3)]
+    for row in rows:
+        assert (row.add_tag("scope_test") == {})
+
+    instance = rows[0][SharedInjectable5]
+    assert (all(row[SharedInjectable5] is instance for row in rows))
+
+    for row in rows:
+        assert (not instance.destroyed)
+        for shared in row.shared:
+            shared._guiml_scope.release(shared)
+
+    assert (instance.destroyed)
+
+    # without an enclosing window the injectable is created per node
+    assert ([*Injector().add_tag("scope_test")] == [SharedInjectable5])
+
+
+def test_ui_loop_on_demand():
+    frames = list()
+    ui_loop = UILoop(UILoop.Dependencies())
+    ui_loop.on_update.subscribe(frames.append)
+    ui_loop.set_on_demand(True)
+    ui_loop.set_update_rate(0.)
+
+    clock.tick()
+    clock.tick()
+    assert (len(frames) == 1)
+
+    ui_loop.request_frame()
+    ui_loop.request_frame()
+    clock.tick()
+    clock.tick()
+    assert (len(frames) == 2)
+
+    # marking an object dirty requests a frame
+    ui_loop.mark_dirty()
+    pop_dirty()
+    clock.tick()
+    assert (len(frames) == 3)
+
+    ui_loop.on_destroy()
@@ -0,0 +1,84 @@
+from guiml.dirty import pop_dirty
+from guiml.reactive import track, forget
+from guiml.observables import (
+    ObservableList,
+    ObservableDict,
+    Change,
+    INSERT,
+    REMOVE,
+    MOVE,
+    UPDATE,
+)
+
+
+class Owner:
+    pass
+
+
+def test_observable_list():
+    items = ObservableList(["a", "b", "c"])
+    changes = list()
+    items.on_change.subscribe(changes.append)
+
+    items.append("d")
+    items.insert(-1, "x")
+    del items[1:3]
+    items.pop(0)
+    items[0] = "y"
+    items.move(0, 5)
+    items.remove("d")
+
+    assert (items == ["y"])
+    assert (changes == [
+        Change(INSERT, 3, ["d"]),
+        Change(INSERT, 3, ["x"]),
+        Change(REMOVE, 1, 2),
+        Change(REMOVE, 0, 1),
+        Change(UPDATE, 0, "y"),
+        Change(MOVE, 0, 1),
+        Change(REMOVE, 0, 1),
+    ])
+
+    # changes that affect all items remove and insert all of them
+    changes.clear()
+    items.extend(["b", "a"])
+    items.sort()
+    assert (changes[1:] == [
+        Change(REMOVE, 0, 3),
+        Change(INSERT, 0, ["a", "b", "y"]),
+    ])
+
+
+def test_observable_dict():
+    items = ObservableDict(a=1)
+    changes = list()
+    items.on_change.subscribe(changes.append)
+
+    items["b"] = 2
+    items.update(a=3)
+    items.pop("b")
+    items.pop("b", None)
+
+    assert (items == {"a": 3})
+    assert (changes == [
+        Change(INSERT, "b", 2),
+        Change(UPDATE, "a", 3),
+        Change(REMOVE, "b", None),
+    ])
+
+
+def test_observable_reads():
+    pop_dirty()
+    items = ObservableList(["a"])
+    owner = Owner()
+
+    with track() as recording:
+        len(items)
+        recording.owner = owner
+
+    items.append("b")
+    assert (pop_dirty() == [owner])
+
+    forget(owner)
+    items.append("c")
+    assert (pop_dirty() == [])
@@ -0,0 +1,49 @@
+from guiml.dirty import pop_dirty
+from guiml.reactive import Reactive, track, forget
+
+
+class State(Reactive):
+
+    def __init__(self):
+        self.text = "a"
+        self.unused = 1
+
+
+class Owner:
+    pass
+
+
+def test_reactive():
+    pop_dirty()
+    state = State()
+    owner = Owner()
+    inner = Owner()
+
+    with track() as recording:
+        state.text
+        with track() as inner_recording:
+            state.unused
+            inner_recording.owner = inner
+        recording.owner = owner
+
+    state.text = "b"
+    assert (pop_dirty() == [owner])
+
+    state.unused = 2
+    assert (pop_dirty() == [inner])
+
+    # reads without owner belong to the enclosing recording
+    with track() as recording:
+        with track():
+            state.unused
+        recording.owner = owner
+
+    state.text = "c"
+    assert (pop_dirty() == [])
+    state.unused = 3
+    assert (sorted(map(id, pop_dirty())) == sorted([id(owner), id(inner)]))
+
+    forget(owner)
+    forget(inner)
+    state.unused = 4
+    assert (pop_dirty() == [])
@@ -0,0 +1,195 @@
+import xml.etree.ElementTree as ET
+
+from dataclasses import dataclass
+
+from guiml.registry import component
+from guiml.resources import RawHandle
+from guiml.compiler import TemplateCompiler
+from guiml.dirty import pop_dirty
+from guiml.observables import ObservableList
+from guiml.transformer import (
+    TemplatesTransformer,
+    ExpressionCache,
+    ControlTransformer,
+)
+
+
+style = RawHandle({})
+
+
+@component("prototype_test",
+           template=RawHandle(ET.fromstring(
+               "<prototype_test><div><text></text></div></prototype_test>")),
+           style=style)
+class PrototypeTest:
+
+    @dataclass
+    class Properties:
+        pass
+
+    @dataclass
+    class Dependencies:
+        pass
+
+
+def test_template_prototype_is_shared():
+    transformer = TemplatesTransformer()
+    nodes = [ET.Element("prototype_test") for i in range(2)]
+    for node in nodes:
+        transformer(node, None)
+
+    first, second = [TemplatesTransformer.get_template(node) for node in nodes]
+    assert (first is second)
+    assert (TemplatesTransformer.get_creator_style(first) is None)
+    for node in first[0].iter():
+        assert (TemplatesTransformer.get_creator_style(node) is style)
+
+
+def test_expression_cache():
+    cache = ExpressionCache(max_size=2)
+    assert (cache.compile("1 + 1") is cache.compile("1 + 1"))
+    assert (eval(cache.compile("x * 2"), None, {"x": 3}) == 6)
+    cache.compile("x = 1", "exec")
+    assert (cache.stats() == {"size": 2, "hits": 1, "misses": 3})
+
+
+def test_eval_for():
+    transformer = ControlTransformer()
+    context = {"self": None, "items": ["a", "b"]}
+    scopes = transformer.eval_for("for i, item in enumerate(items)", context)
+
+    # scopes only hold the loop variables and are created lazily
+    first = next(scopes)
+    assert (dict(first) == {"i": 0, "item": "a"})
+    assert (first["items"] is context["items"])
+    assert ([scope["item"] for scope in scopes] == ["b"])
+
+
+@component("compiler_test",
+           template=RawHandle(ET.fromstring("""
+<compiler_test>
+  intro text
+  <div control="for i, item in enumerate(self.items)" py_index="i"
+       class_odd="i % 2" bind_text="item" on_click="self.click">
+    <text py_text="item"></text> tail
+  </div>
+  <div control="if not self.items">empty</div>
+</compiler_test>""")),
+           style=style)
+class CompilerTest:
+
+    @dataclass
+    class Properties:
+        pass
+
+    @dataclass
+    class Dependencies:
+        pass
+
+    def __init__(self):
+        self.items = ["a", "b"]
+
+    def click(self):
+        pass
+
+
+def expanded(node):
+    def value(item):
+        if isinstance(item, property):
+            return item.fget(None)
+        elif callable(item):
+            return item()
+
+        return item
+
+    return [(child.tag, child.text, child.tail,
+             {key: value(item) for key, item in child.attrib.items()})
+            for child in node.iter() if child is not node]
+
+
+def test_template_compiler():
+    results = list()
+    for compiler in [None, TemplateCompiler()]:
+        transformer = ControlTransformer(compiler=compiler)
+        component = CompilerTest()
+        node = ET.Element("compiler_test")
+        TemplatesTransformer()(node, component)
+        transformer(node, component)
+        results.append(expanded(node))
+
+        component.items = []
+        transformer(node, component)
+        results.append(expanded(node))
+
+    assert (results[0] == results[2])
+    assert (results[1] == results[3])
+    assert (len(results[0]) == 8)
+    # closures keep the value of the loop variables of their iteration
+    assert (results[0][2][3]["text"] == "a")
+    assert (results[1][-1] == ("text", "empty ", None, {}))
+
+
+def test_deep_template():
+    depth = 5000
+    template = ET.Element("deep_test")
+    node = template
+    for i in range(depth):
+        node = ET.SubElement(node, "div", py_depth=str(i))
+
+    target = ET.Element("deep_test")
+    ControlTransformer().transform(template, {"self": None}, target,
+                                   component_root=True)
+    depths = [node.get("depth") for node in target.iter("div")]
+    assert (depths == list(range(depth)))
+
+
+def test_patch_for():
+    template = ET.fromstring("""
+<patch_test>
+  <div control="for item in items" py_item="item">
+    <text py_text="item"></text>
+  </div> row
+  <div control="for item in items" py_item="item"></div>
+  <text>end</text>
+</patch_test>""")
+
+    def expand(items):
+        target = ET.Element("patch_test")
+        transformer.transform(template, {"self": None, "items": items}, target,
+                              component_root=True)
+        return target
+
+    pop_dirty()
+    transformer = ControlTransformer()
+    items = ObservableList(["a", "b", "c"])
+    target = expand(items)
+    first, second = target.get(ControlTransformer.EXPANSIONS_ATTRIBUTE)
+    kept = target[6]
+
+    items.insert(0, "x")
+    items.move(3, 1)
+    items[2] = "y"
+    assert (sorted(map(id, pop_dirty())) == sorted([id(first), id(second)]))
+
+    patched = transformer.patch(first)
+    # only the inserted and the updated item are expanded
+    assert ([node.get("item") for node in patched] == ["x", "y"])
+    # the children of the second for control moved
+    assert (target[8] is kept)
+    transformer.patch(second)
+    assert (expanded(target) == expanded(expand(list(items))))
+
+    # an item changed twice is expanded with its last value
+    items[1] = "v"
+    items[1] = "w"
+    items.insert(0, "s")
+    items[0] = "t"
+    assert ([node.get("item") for node in transformer.patch(first)]
+            == ["w", "t"])
+    transformer.patch(second)
+    assert (expanded(target) == expanded(expand(list(items))))
+
+    # expanding the target again makes the expansions outdated
+    transformer.transform(template, {"self": None, "items": items}, target,
+                          component_root=True)
+    assert (transformer.patch(first) is None)